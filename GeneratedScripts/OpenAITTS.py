@@ -3,6 +3,7 @@ import argparse
 import json
 import os
 import sys
+import threading
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -19,10 +20,14 @@ def find_openaifm_data_dir() -> Optional[Path]:
     """Try to locate the OpenAIFM module data directory that should contain voices.json.
 
     Strategies:
-    - Try importing an installed `openaifm` module.
+    - Use the `data` folder next to the cached openaifm.py location.
     - Walk upward from this script to find a `ComfyUI/custom_nodes/ComfyUI-OpenAI-FM/data` folder.
     Returns Path to the data dir or None.
     """
+    cached = _read_cached_module_file()
+    if cached and (cached.parent / "data").exists():
+        return cached.parent / "data"
+
     #Walk up from current file to locate ComfyUI custom_nodes folder
     current = Path(__file__).resolve()
     for parent in current.parents:
@@ -143,24 +148,154 @@ def list_voice_names(voices: Any) -> List[str]:
     return names
 
 
-def download_url(url: str, dest_dir: Path) -> Optional[Path]:
+# Compiled voice/vibe index, rebuilt when voices.json or vibes.json change
+CATALOG_CACHE = Path(__file__).resolve().parent.parent / ".cache" / "voice_catalog.json"
+CATALOG_FILES = ("voices.json", "vibes.json")
+
+
+class VoiceCatalog:
+    """Voice and vibe names of the OpenAIFM node with constant-time lookups."""
+
+    def __init__(self, data_dir: Path, voices: List[str], vibes: List[str], urls: List[str], mtimes: Dict[str, float]):
+        self.data_dir = data_dir
+        self.voices = voices
+        self.vibes = vibes
+        self.urls = urls
+        self.mtimes = mtimes
+        self._voice_index = {name.lower(): name for name in voices}
+        self._vibe_index = {name.lower(): name for name in vibes}
+
+    @classmethod
+    def build(cls, data_dir: Path, mtimes: Dict[str, float]) -> "VoiceCatalog":
+        """Parse voices.json and vibes.json into a catalogue."""
+        voices = load_voices_json(data_dir)
+        vibes = None
+        try:
+            with (data_dir / "vibes.json").open("r", encoding="utf-8") as f:
+                vibes = json.load(f)
+        except (OSError, ValueError):
+            pass
+        vibe_names = list(vibes.keys()) if isinstance(vibes, dict) else []
+        urls = extract_urls_from_voices(voices) if voices is not None else []
+        return cls(data_dir, list_voice_names(voices), vibe_names, urls, mtimes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"data_dir": str(self.data_dir), "mtimes": self.mtimes,
+                "voices": self.voices, "vibes": self.vibes, "urls": self.urls}
+
+    def resolve_voice(self, name: str) -> Optional[str]:
+        """Return the catalogue spelling of a voice name (case-insensitive), or None if unknown."""
+        return self._voice_index.get(name.lower())
+
+    def resolve_vibe(self, name: str) -> Optional[str]:
+        """Return the catalogue spelling of a vibe name (case-insensitive), or None if unknown."""
+        return self._vibe_index.get(name.lower())
+
+    def has_voice(self, name: str) -> bool:
+        return name.lower() in self._voice_index
+
+    def has_vibe(self, name: str) -> bool:
+        return name == "---" or name.lower() in self._vibe_index
+
+
+_catalog: Optional[VoiceCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def _catalog_mtimes(data_dir: Path) -> Dict[str, float]:
+    mtimes = {}
+    for name in CATALOG_FILES:
+        try:
+            mtimes[name] = (data_dir / name).stat().st_mtime
+        except OSError:
+            mtimes[name] = 0.0
+    return mtimes
+
+
+def load_voice_catalog(refresh: bool = False) -> Optional[VoiceCatalog]:
+    """Return the voice catalogue, reparsing the JSON files only when they changed.
+
+    The catalogue is kept in memory and in .cache/voice_catalog.json; both are
+    reused while the recorded modification times of voices.json and vibes.json
+    still match.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is not None and not refresh and _catalog_mtimes(_catalog.data_dir) == _catalog.mtimes:
+            return _catalog
+        try:
+            with CATALOG_CACHE.open("r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+        if _catalog is not None:
+            data_dir = _catalog.data_dir
+        elif cached.get("data_dir") and Path(cached["data_dir"]).is_dir():
+            # Skip the directory walk while the remembered data dir still exists
+            data_dir = Path(cached["data_dir"])
+        else:
+            data_dir = find_openaifm_data_dir()
+        if data_dir is None:
+            return None
+        mtimes = _catalog_mtimes(data_dir)
+        if not refresh and cached.get("data_dir") == str(data_dir) and cached.get("mtimes") == mtimes:
+            try:
+                _catalog = VoiceCatalog(data_dir, cached["voices"], cached["vibes"], cached["urls"], mtimes)
+                return _catalog
+            except (KeyError, TypeError):
+                pass
+        _catalog = VoiceCatalog.build(data_dir, mtimes)
+        try:
+            CATALOG_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            with CATALOG_CACHE.open("w", encoding="utf-8") as f:
+                json.dump(_catalog.to_dict(), f, ensure_ascii=False)
+        except OSError:
+            pass
+        return _catalog
+
+
+# Resolved location of openaifm.py, remembered across runs so the parent walk happens once
+MODULE_PATH_CACHE = Path(__file__).resolve().parent.parent / ".cache" / "openaifm_path.json"
+
+# The openaifm module is executed once per process and shared by every caller
+_openaifm_module: Optional[Any] = None
+_openaifm_node: Optional[Any] = None
+_openaifm_lock = threading.RLock()
+
+
+def _read_cached_module_file() -> Optional[Path]:
     try:
-        dest_dir.mkdir(parents=True, exist_ok=True)
-        # choose filename from URL
-        filename = url.split("/")[-1].split("?")[0] or "file.bin"
-        dest = dest_dir / filename
-        # use urllib to avoid extra deps
-        import urllib.request
-
-        with urllib.request.urlopen(url) as resp, dest.open("wb") as out:
-            out.write(resp.read())
-        return dest
-    except Exception:
+        with MODULE_PATH_CACHE.open("r", encoding="utf-8") as f:
+            cached = Path(json.load(f)["openaifm"])
+    except (OSError, ValueError, KeyError, TypeError):
         return None
+    return cached if cached.exists() else None
+
+
+def _write_cached_module_file(path: Path) -> None:
+    try:
+        MODULE_PATH_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        with MODULE_PATH_CACHE.open("w", encoding="utf-8") as f:
+            json.dump({"openaifm": str(path)}, f)
+    except OSError:
+        pass
 
 
 def find_openaifm_module_file() -> Optional[Path]:
-    """Find the path to openaifm.py inside a ComfyUI-OpenAI-FM custom node folder."""
+    """Find the path to openaifm.py inside a ComfyUI-OpenAI-FM custom node folder.
+
+    The resolved path is cached on disk and reused while the file still exists.
+    """
+    cached = _read_cached_module_file()
+    if cached:
+        return cached
+    found = _walk_for_openaifm_module_file()
+    if found:
+        _write_cached_module_file(found)
+    return found
+
+
+def _walk_for_openaifm_module_file() -> Optional[Path]:
     current = Path(__file__).resolve()
     for parent in current.parents:
         cand = parent / "ComfyUI" / "custom_nodes" / "ComfyUI-OpenAI-FM" / "openaifm.py"
@@ -177,22 +312,50 @@ def find_openaifm_module_file() -> Optional[Path]:
 
 
 def load_openaifm_module() -> Optional[Any]:
-    """Dynamically load the openaifm module from its file path and return the module object."""
-    mod_file = find_openaifm_module_file()
-    if not mod_file:
-        return None
-    try:
-        spec = importlib.util.spec_from_file_location("openaifm_custom", str(mod_file))
-        if spec is None:
+    """Dynamically load the openaifm module from its file path and return the module object.
+
+    The module is executed only on the first call; later calls return the same object.
+    """
+    global _openaifm_module
+    with _openaifm_lock:
+        if _openaifm_module is not None:
+            return _openaifm_module
+        if "openaifm_custom" in sys.modules:
+            _openaifm_module = sys.modules["openaifm_custom"]
+            return _openaifm_module
+        mod_file = find_openaifm_module_file()
+        if not mod_file:
             return None
-        module = importlib.util.module_from_spec(spec)
-        loader = getattr(spec, "loader", None)
-        if loader is None:
+        try:
+            spec = importlib.util.spec_from_file_location("openaifm_custom", str(mod_file))
+            if spec is None:
+                return None
+            module = importlib.util.module_from_spec(spec)
+            loader = getattr(spec, "loader", None)
+            if loader is None:
+                return None
+            sys.modules["openaifm_custom"] = module
+            try:
+                loader.exec_module(module)  # type: ignore[attr-defined]
+            except Exception:
+                del sys.modules["openaifm_custom"]
+                raise
+            _openaifm_module = module
+            return module
+        except Exception:
             return None
-        loader.exec_module(module)  # type: ignore[attr-defined]
-        return module
-    except Exception:
-        return None
+
+
+def get_openaifm_node() -> Optional[Any]:
+    """Return a shared OPENAIFM node instance, creating it on first use."""
+    global _openaifm_node
+    with _openaifm_lock:
+        if _openaifm_node is None:
+            mod = load_openaifm_module()
+            if mod is None or not hasattr(mod, "OPENAIFM"):
+                return None
+            _openaifm_node = mod.OPENAIFM()
+        return _openaifm_node
 
 
 def generate_with_openaifm_node(text: str, voice: str, vibe: str = "---", optional_vibe_text: str = "") -> Optional[Dict[str, Any]]:
@@ -208,7 +371,7 @@ def generate_with_openaifm_node(text: str, voice: str, vibe: str = "---", option
         print("Loaded module does not contain OPENAIFM class")
         return None
     try:
-        node = mod.OPENAIFM()
+        node = get_openaifm_node()
         result = node.generate(text, voice, vibe, optional_vibe_text)
         # node.generate returns a tuple with dict as first element per ComfyUI convention
         if isinstance(result, tuple) and len(result) > 0 and isinstance(result[0], dict):
@@ -223,6 +386,7 @@ def main_cli() -> None:
     p = argparse.ArgumentParser(description="OpenAI TTS example + OpenAIFM voices helper")
     p.add_argument("--list-voices", action="store_true", help="Locate OpenAIFM data and list available voice names")
     p.add_argument("--download-voices", nargs="?", const="./downloaded_voices", help="Download any URLs found in voices.json to the target folder (default: ./downloaded_voices)")
+    p.add_argument("--download-workers", type=int, default=4, help="Parallel downloads for --download-voices")
     p.add_argument("--play-voice", nargs="?", const="Shimmer", help="Play demo text using the specified voice name (default: Shimmer)")
     p.add_argument("--use-openaifm", action="store_true", help="Use the local OpenAIFM node (ComfyUI) to generate audio instead of remote SDKs")
     p.add_argument("--text", nargs="?", help="Text to synthesize; if omitted uses built-in demo text")
@@ -230,19 +394,17 @@ def main_cli() -> None:
     p.add_argument("--optional-vibe-text", nargs="?", default="", help="Custom vibe prompt text to override vibe selection (optional)")
     args = p.parse_args()
 
-    data_dir = find_openaifm_data_dir()
-    voices = None
-    if data_dir:
-        voices = load_voices_json(data_dir)
+    catalog = load_voice_catalog()
+    voices_found = catalog is not None and (catalog.data_dir / "voices.json").exists()
 
     if args.list_voices:
-        if not data_dir or voices is None:
+        if not voices_found:
             print("OpenAIFM voices.json not found; make sure ComfyUI-OpenAI-FM/data/voices.json exists")
             sys.exit(1)
-        names = list_voice_names(voices)
+        names = catalog.voices
         if not names:
             print("No voice names found in voices.json; printing raw structure:")
-            print(json.dumps(voices, ensure_ascii=False, indent=2))
+            print(json.dumps(load_voices_json(catalog.data_dir), ensure_ascii=False, indent=2))
             return
         print("Voices found:")
         for n in names:
@@ -250,19 +412,21 @@ def main_cli() -> None:
         return
 
     if args.download_voices:
-        if not data_dir or voices is None:
+        if not voices_found:
             print("OpenAIFM voices.json not found; cannot download")
             sys.exit(1)
-        urls = extract_urls_from_voices(voices)
+        urls = catalog.urls
         if not urls:
             print("No download URLs found in voices.json")
             sys.exit(0)
+        sys.path.append(str(Path(__file__).resolve().parent.parent))
+        from downloader import Downloader
         dest = Path(args.download_voices)
         print(f"Downloading {len(urls)} files to {dest}")
-        for u in urls:
-            print("->", u)
-            out = download_url(u, dest)
-            print("   saved:" if out else "   failed to download", out)
+        summary = Downloader(dest, workers=args.download_workers).download_all(urls)
+        print(summary)
+        if summary.count("failed"):
+            sys.exit(1)
         return
 
     # Default: use OPENAIFM node if available or requested
@@ -185,10 +185,16 @@ def run_scraper():
 
             
 def parse_with_AI():
-    from openai import OpenAI
-    import subprocess
     import json
-    import time
+    import sys
+    import os
+
+    # Add parent directory to path to import the LLM helpers
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from token_budget import chunk_budget, count_tokens, map_reduce
+    from llm_client import LLMClient
+    from llm_cache import LLMCache
+    from lms_lifecycle import ensure_model
 
 
     with open("scraped_data.json", "r") as f:
@@ -196,72 +202,29 @@ def parse_with_AI():
 
 
 
-    time.sleep(10)
-    client = OpenAI(base_url='http://localhost:1234/v1', api_key="Nothing here")
-    run_subprocess("lms server start")
-    run_subprocess("lms load cognitivecomputations/Dolphin3.0-Llama3.1-8B-GGUF/Dolphin3.0-Llama3.1-8B-Q3_K_S.gguf --context-length 8096 --gpu max")
+    # Identical requests are answered from the response cache (LLM_CACHE=off to ask the model again).
+    # The model is loaded, unless it is still warm, only when a request misses the cache.
+    llm = LLMClient(cache=LLMCache(), prepare=lambda: ensure_model("cognitivecomputations/Dolphin3.0-Llama3.1-8B-GGUF/Dolphin3.0-Llama3.1-8B-Q3_K_S.gguf"))
 
 
-    def estimate_tokens(text):
-        # Estimate tokens by counting words
-        words = text.split()
-        return len(words)
+    cleanup_prompt = "Without providing any justification or feedback and not adding any words, analyze the provided text and remove everything that does not seems to integrate with the text like generic messages at the start and the end of the text."
 
     def analyze_text_content(text):
-        print(f"Analyzing text chunk of approximately {{estimate_tokens(text)}} tokens")
-        completion = client.chat.completions.create(
-            model="dolphin3.0-llama3.1-8b@q3_k_s",
-            messages=[
-                {{"role": "system", "content": "Without providing any justification or feedback and not adding any words, analyze the provided text and remove everything that does not seems to integrate with the text like generic messages at the start and the end of the text."}},
-                {{"role": "user", "content": text}}
-            ],
-            stream=False
-        )
-        
-        return completion.choices[0].message.content
+        print(f"Analyzing text chunk of {{count_tokens(text)}} tokens")
+        return llm.complete(cleanup_prompt, text)
 
 
     # Create a single string from all data entries
     text_parts = [json.dumps(item["data"]) for item in data]
     text = " ".join(text_parts)
     
-    # Check if text exceeds token limit and split if necessary
-    token_limit = 5000
-    estimated_tokens = estimate_tokens(text)
-    
-    final_result = ""
-    if estimated_tokens > token_limit:
-        print(f"Text is too large ({{estimated_tokens}} estimated tokens). Splitting into chunks...")
-        
-        # Calculate how many chunks we need
-        num_chunks = (estimated_tokens // token_limit) + 1
-        
-        # Calculate characters per chunk (roughly)
-        chars_per_chunk = len(text) // num_chunks
-        
-        chunks = []
-        for i in range(num_chunks):
-            start_pos = i * chars_per_chunk
-            end_pos = start_pos + chars_per_chunk if i < num_chunks - 1 else len(text)
-            chunks.append(text[start_pos:end_pos])
-        
-        # Process each chunk
-        results = []
-        for i, chunk in enumerate(chunks):
-            print(f"Processing chunk {{i+1}}/{{num_chunks}}")
-            result = analyze_text_content(chunk)
-            results.append(result)
-        
-        # Combine results
-        final_result = " ".join(results)
-        print(final_result)
-    else:
-        # Process as a single chunk
-        final_result = analyze_text_content(text)
-        print(final_result)
+    # The cleaned text is about as long as its input, so prompt, chunk and reply must share the context.
+    # Chunks end on sentence boundaries and are all submitted at once; the LLM client's limiter decides
+    # how many are cleaned concurrently, and the results are joined in order.
+    final_result = map_reduce(text, analyze_text_content, max_tokens=chunk_budget(cleanup_prompt), workers=0)
+    print(final_result)
+    print(llm.summary())
         
-    run_subprocess("lms unload --all")
-    run_subprocess("lms server stop")
 
     with open("processed.txt", "w", encoding="utf-8") as f:
         f.write(final_result)
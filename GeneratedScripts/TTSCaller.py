@@ -3,30 +3,231 @@
 
 This script is a small wrapper intended to be invoked by the UI. It dynamically
 loads the `openaifm.py` module from the ComfyUI custom node and calls OPENAIFM.generate.
+--backend local (offline synthesizer) or --backend http (e.g. the mock server in
+dev_servers.py) run it without the node or network access.
 """
 import argparse
+import random
 import subprocess
 import sys
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add parent directory to path to import helper
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from helper import run_subprocess
+from tts_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, TTSCache, cache_key
+from audio_utils import TARGET_LUFS, postprocess_clips, split_at_silences, to_mono, waveform_to_array, write_wav
+from audio_stream import AudioStreamWriter
+from tts_backends import BACKENDS, DEFAULT_BACKEND_URL, create_backend
+from sentence_split import build_manifest, write_manifest
+from sentence_stream import follow_sentences
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 
+# Sentence WAVs written by this script; zero-padded so sorted names follow sentence order
+WAV_PREFIX = 'TTS_'
+
+
+class RateLimiter:
+    """Space out request starts so at most `rate` requests begin per second."""
+
+    def __init__(self, rate: float = 0.0):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_start = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def wav_sink(output_dir: Path):
+    """Return a sink that saves each sentence as TTS_<index>.wav in output_dir."""
+    def write(index: int, data, sample_rate: int) -> Path:
+        path = output_dir / f'{WAV_PREFIX}{index:04d}.wav'
+        write_wav(path, data, sample_rate)
+        return path
+    return write
+
+
+def stream_sink(writer: AudioStreamWriter):
+    """Return a sink that appends each sentence to an audio stream."""
+    def write(index: int, data, sample_rate: int) -> str:
+        writer.write(index, data, sample_rate)
+        return writer.directory
+    return write
+
+
+def postprocess_sentences(collected: dict, sink, target_lufs: float = TARGET_LUFS) -> dict:
+    """Trim silence from buffered sentences, match their loudness, then pass them to sink.
+
+    collected maps sentence index to (samples, sample_rate). Returns a dict of
+    sentence index to the sink's result.
+    """
+    saved = {}
+    by_rate = {}
+    for index, (data, sample_rate) in collected.items():
+        by_rate.setdefault(sample_rate, []).append(index)
+    for sample_rate, indexes in by_rate.items():
+        indexes.sort()
+        clips = postprocess_clips([collected[index][0] for index in indexes], sample_rate, target_lufs)
+        for index, clip in zip(indexes, clips):
+            saved[index] = sink(index, clip, sample_rate)
+    return saved
+
+
+def pack_sentences(sentences: list, batch_chars: int = 0) -> list:
+    """Group consecutive sentence indexes so each group's text stays within batch_chars.
+
+    A sentence longer than the budget gets a group of its own; batch_chars <= 0
+    puts every sentence in its own group.
+    """
+    groups = []
+    length = 0
+    for index, sentence in enumerate(sentences):
+        if groups and batch_chars > 0 and length + 1 + len(sentence) <= batch_chars:
+            groups[-1].append(index)
+            length += 1 + len(sentence)
+        else:
+            groups.append([index])
+            length = len(sentence)
+    return groups
+
+
+def synthesize_with_retry(generate, index: int, sentence: str, retries: int, backoff: float, limiter: RateLimiter):
+    """Call generate(sentence) until it returns audio, backing off exponentially between attempts."""
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            result = generate(sentence)
+            if isinstance(result, tuple) and result and isinstance(result[0], dict):
+                return result[0]
+            print(f'Sentence {index+1} returned no audio (attempt {attempt+1})', file=sys.stderr)
+        except Exception as e:
+            print(f'Error generating sentence {index+1} (attempt {attempt+1}): {e}', file=sys.stderr)
+        if attempt < retries:
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random() * 0.25))
+    return None
+
+
+def synthesize_sentences(sentences, make_generate, sink, concurrency: int = 1,
+                         retries: int = 2, backoff: float = 1.0, max_rps: float = 0.0,
+                         cache: TTSCache = None, cache_params: tuple = (), batch_chars: int = 0) -> dict:
+    """Synthesize sentences on a worker pool and hand each one to sink.
+
+    make_generate() is called once per worker thread and must return a callable
+    taking a text and returning the node result. sink(index, samples, sample_rate)
+    receives every sentence with its index, so the output order does not depend
+    on completion order (see wav_sink and stream_sink). With a cache,
+    sentences already synthesized with the same cache_params (voice, vibe,
+    vibe text, backend) are restored from it instead of being requested again.
+
+    With batch_chars > 0, consecutive sentences are packed into one request up to
+    that many characters, and the returned audio is split back into sentences at
+    the silences between them.
+
+    sentences may also be an iterator that yields sentences while they are still
+    being written (see sentence_stream.follow_sentences); each one is submitted
+    as soon as it arrives, and batching does not apply.
+
+    Returns a dict of sentence index to the sink's result for the sentences that succeeded.
+    """
+    limiter = RateLimiter(max_rps)
+    local = threading.local()
+    saved = {}
+    streaming = not isinstance(sentences, list)
+    if streaming:
+        received, sentences = sentences, []
+
+    def of_total() -> str:
+        # The number of followed sentences is unknown until the stream ends
+        return '' if streaming else f'/{len(sentences)}'
+
+    def work(group: list):
+        keys = {index: cache_key(sentences[index], *cache_params) if cache is not None else None for index in group}
+        done = {}
+        for index in group:
+            cached = cache.get(keys[index]) if keys[index] else None
+            if cached is not None:
+                print(f'Cached sentence {index+1}{of_total()}: {sentences[index][:60]}...')
+                done[index] = sink(index, *cached)
+        pending = [index for index in group if index not in done]
+        if not pending:
+            return done
+        if not hasattr(local, 'generate'):
+            local.generate = make_generate()
+        text = ' '.join(sentences[index] for index in pending)
+        label = f'{pending[0]+1}' if len(pending) == 1 else f'{pending[0]+1}-{pending[-1]+1}'
+        print(f'Generating sentence {label}{of_total()}: {text[:60]}...')
+        audio = synthesize_with_retry(local.generate, pending[0], text, retries, backoff, limiter)
+        if audio is None:
+            print(f'Failed to generate sentence {label}', file=sys.stderr)
+            return done
+        data = waveform_to_array(audio['waveform'])
+        segments = split_at_silences(to_mono(data), audio['sample_rate'], [len(sentences[index]) for index in pending])
+        for index, (start, end) in zip(pending, segments):
+            if keys[index]:
+                cache.put(keys[index], data[start:end], audio['sample_rate'], text=sentences[index], voice=cache_params[0])
+            done[index] = sink(index, data[start:end], audio['sample_rate'])
+        return done
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        if streaming:
+            futures = []
+            for sentence in received:
+                sentences.append(sentence)
+                futures.append(executor.submit(work, [len(sentences) - 1]))
+        else:
+            groups = pack_sentences(sentences, batch_chars)
+            if batch_chars > 0:
+                print(f'Packed {len(sentences)} sentences into {len(groups)} requests of up to {batch_chars} characters')
+            futures = [executor.submit(work, group) for group in groups]
+        for future in futures:
+            saved.update(future.result())
+    return saved
+
+
 def main() -> int:
     p = argparse.ArgumentParser()
     p.add_argument('--text', help='Text to synthesize')
     p.add_argument('--text-file', help='Path to file containing text to synthesize')
+    p.add_argument('--follow-sentences', help='Synthesize sentences from a .sentences.jsonl stream (e.g. processed.sentences.jsonl from NewsCheck) while it is being written')
+    p.add_argument('--follow-timeout', type=float, default=600.0, help='Seconds to wait for the next streamed sentence')
     p.add_argument('--voice', required=True)
     p.add_argument('--vibe', default='---')
     p.add_argument('--optional-vibe-text', default='')
+    p.add_argument('--backend', choices=BACKENDS, default='openaifm', help='Speech synthesis backend')
+    p.add_argument('--backend-url', default=DEFAULT_BACKEND_URL, help='Endpoint of the http backend')
+    p.add_argument('--concurrency', type=int, default=4, help='Number of sentences synthesized in parallel')
+    p.add_argument('--retries', type=int, default=2, help='Retries per sentence after a failed request')
+    p.add_argument('--backoff', type=float, default=1.0, help='Initial retry delay in seconds (doubles per retry)')
+    p.add_argument('--max-rps', type=float, default=0.0, help='Maximum requests started per second (0 = unlimited)')
+    p.add_argument('--output-dir', help='Where to write sentence WAVs (default: ComfyUI/output)')
+    p.add_argument('--stream-out', help='Append sentence audio to this stream directory instead of writing WAVs')
+    p.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Persistent TTS cache directory')
+    p.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_MB, help='Size cap of the TTS cache in MB')
+    p.add_argument('--no-cache', action='store_true', help='Always synthesize, bypassing the TTS cache')
+    p.add_argument('--postprocess', action='store_true', help='Trim sentence silence and match loudness before saving')
+    p.add_argument('--target-lufs', type=float, default=TARGET_LUFS, help='Sentence loudness with --postprocess')
+    p.add_argument('--batch-chars', type=int, default=0, help='Pack consecutive sentences into one request up to this many characters (0 = one request per sentence)')
     args = p.parse_args()
     
-    # Get text from either --text or --text-file
-    if args.text_file:
+    # Get text from either --text or --text-file, unless it is followed sentence by sentence
+    if args.follow_sentences:
+        text_content = None
+        if args.batch_chars > 0:
+            print('--batch-chars does not apply to followed sentences; sending one request per sentence', file=sys.stderr)
+    elif args.text_file:
         try:
             with open(args.text_file, 'r', encoding='utf-8') as f:
                 text_content = f.read()
@@ -41,49 +242,117 @@ def main() -> int:
 
     # Load local OpenAITTS helper if present
     try:
-        import importlib.util
-        openaitts_path = SCRIPT_DIR / 'OpenAITTS.py'
-        if openaitts_path.exists():
-            spec = importlib.util.spec_from_file_location('openaitts_local', str(openaitts_path))
-            if spec and spec.loader:
-                openaitts = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(openaitts)
-            else:
-                openaitts = None
-        else:
+        if str(SCRIPT_DIR) not in sys.path:
+            sys.path.insert(0, str(SCRIPT_DIR))
+        try:
+            import OpenAITTS as openaitts
+        except ImportError:
             openaitts = None
 
         if openaitts is None or not hasattr(openaitts, 'load_openaifm_module'):
             print('Helper OpenAITTS.py or loader not found', file=sys.stderr)
             return 2
 
-        openaifm_mod = openaitts.load_openaifm_module()
-        if openaifm_mod is None or not hasattr(openaifm_mod, 'OPENAIFM'):
-            print('Could not load openaifm module', file=sys.stderr)
-            return 3
-
-        node = openaifm_mod.OPENAIFM()
-
-        # Split text into sentences similar to MTTS_apiForGenerated.py
-        import re
-        sentences = re.split(r'(?<=[.!?])\s+', text_content)
-        any_success = False
-        for i, sentence in enumerate(sentences):
-            s = sentence.strip()
-            if not s or len(s) < 2:
-                continue
-            print(f'Generating sentence {i+1}/{len(sentences)}: {s[:60]}...')
+        openaifm_mod = None
+        if args.backend == 'openaifm':
+            openaifm_mod = openaitts.load_openaifm_module()
+            if openaifm_mod is None or not hasattr(openaifm_mod, 'OPENAIFM'):
+                print('Could not load openaifm module', file=sys.stderr)
+                return 3
+            catalog = openaitts.load_voice_catalog()
+            if catalog is not None and catalog.voices:
+                voice = catalog.resolve_voice(args.voice)
+                if voice is None:
+                    print(f'Voice {args.voice!r} is not in voices.json', file=sys.stderr)
+                    return 3
+                args.voice = voice
+                if not catalog.has_vibe(args.vibe):
+                    print(f'Vibe {args.vibe!r} is not in vibes.json; using it as given', file=sys.stderr)
+
+        stream = None
+        if args.stream_out:
             try:
-                result = node.generate(s, args.voice, args.vibe, args.optional_vibe_text)
-                # node.generate internally saves audio via save_audio_file
-                if result is None:
-                    print(f'Failed to generate sentence {i+1}', file=sys.stderr)
-                else:
-                    any_success = True
-            except Exception as e:
-                print(f'Error generating sentence {i+1}: {e}', file=sys.stderr)
-
-        if any_success:
+                stream = AudioStreamWriter(args.stream_out)
+            except FileExistsError as e:
+                print(e, file=sys.stderr)
+                return 3
+            sink = stream_sink(stream)
+            output_dir = Path(args.stream_out)
+        else:
+            if args.output_dir:
+                output_dir = Path(args.output_dir)
+            else:
+                comfyui_root = openaitts.find_comfyui_root()
+                if comfyui_root is None:
+                    print('Could not locate the ComfyUI output directory', file=sys.stderr)
+                    return 3
+                output_dir = comfyui_root / 'output'
+            output_dir.mkdir(parents=True, exist_ok=True)
+            for stale in output_dir.glob(f'{WAV_PREFIX}*.wav'):
+                stale.unlink()
+            sink = wav_sink(output_dir)
+
+        def make_generate():
+            backend = create_backend(args.backend, openaifm_mod, args.backend_url)
+            return lambda sentence: backend.generate(sentence, args.voice, args.vibe, args.optional_vibe_text)
+
+        # The editor times subtitles from this manifest rather than splitting the text again
+        followed = []
+        if text_content is None:
+            # The manifest is written once the stream is done
+            def record(stream_sentences):
+                for sentence in stream_sentences:
+                    followed.append(sentence)
+                    yield sentence
+            sentences = record(follow_sentences(args.follow_sentences, timeout=args.follow_timeout))
+        else:
+            manifest = build_manifest(text_content)
+            write_manifest(manifest, str(output_dir))
+            sentences = [entry['text'] for entry in manifest['sentences']]
+        cache = None if args.no_cache else TTSCache(args.cache_dir, args.cache_max_mb)
+
+        durations = {}
+        collected = {}
+
+        def recording_sink(index, data, sample_rate):
+            durations[index] = len(data) / float(sample_rate)
+            return sink(index, data, sample_rate)
+
+        def collecting_sink(index, data, sample_rate):
+            # Post-processing needs every sentence, so they are buffered until synthesis ends
+            collected[index] = (data, sample_rate)
+            return index
+
+        synth_sink = collecting_sink if args.postprocess else recording_sink
+        started = time.perf_counter()
+        try:
+            saved = synthesize_sentences(sentences, make_generate, synth_sink, concurrency=args.concurrency,
+                                         retries=args.retries, backoff=args.backoff, max_rps=args.max_rps,
+                                         cache=cache, cache_params=(args.voice, args.vibe, args.optional_vibe_text, args.backend),
+                                         batch_chars=args.batch_chars)
+            if args.postprocess:
+                raw_seconds = sum(len(data) / float(rate) for data, rate in collected.values())
+                saved = postprocess_sentences(collected, recording_sink, args.target_lufs)
+                print(f'Post-processed {len(saved)} sentences: {raw_seconds:.1f}s -> {sum(durations.values()):.1f}s '
+                      f'at {args.target_lufs} LUFS')
+        finally:
+            if stream is not None:
+                stream.close()
+        if text_content is None:
+            manifest = build_manifest(' '.join(followed), followed)
+            sentences = followed
+        # Exact durations let the editor time subtitles without probing the audio
+        for entry in manifest['sentences']:
+            if entry['index'] in durations:
+                entry['duration'] = round(durations[entry['index']], 6)
+        write_manifest(manifest, str(output_dir))
+        print(f'Synthesized {len(saved)}/{len(sentences)} sentences in {time.perf_counter() - started:.1f}s '
+              f'with concurrency {args.concurrency} ({args.backend} backend)')
+        if cache is not None:
+            cache.save()
+            print(cache.summary())
+
+        if saved:
             print('Generation completed')
             return 0
         else:
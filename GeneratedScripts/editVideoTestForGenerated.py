@@ -5,8 +5,8 @@ import numpy as np
 import torch
 import subprocess
 import argparse
-import re
 import gc
+import json
 import logging
 import shutil
 
@@ -15,12 +15,21 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from helper import setup_script_logging, run_subprocess
+from clip_render import CLIP_FPS, clip_resolution, create_zoom_video, trim_clip
+from prompt_planner import load_plan
+from frame_handoff import read_manifest, run_id_for
+from audio_stream import AudioStreamReader, remove_stream
+from audio_utils import write_wav
+from sentence_split import (MANIFEST_NAME as SENTENCE_MANIFEST_NAME, read_manifest as read_sentence_manifest,
+                            split_sentences)
 # Configure logging
 
 logger = setup_script_logging('VideoProcessor')
 
 parser=argparse.ArgumentParser(description='Run a series of scripts in sequence.')
 parser.add_argument('--add-minigame', choices=['True', 'False'], default='False', help='Add a minigame to the video (True/False)')
+parser.add_argument('--clips-manifest', default=None, help='Manifest of images and pre-rendered zoom clips written by pipelineForGenerated.py')
+parser.add_argument('--audio-stream', default=None, help='Sentence audio stream written by TTSCaller.py --stream-out (replaces the WAV scan)')
 args = parser.parse_args()
 
 
@@ -134,81 +143,118 @@ hw_encoder = detect_hardware_encoder()
 device = torch.device(hw_encoder["device"] if hw_encoder["device"] == "cuda" else "cpu")
 logger.info(f"Using device: {device}")
 
-def create_zoom_video(image_file, output_video, duration=10, fps=30, zoom_limit=1.5, resolution="1280x720"):
-    """
-    Create a zoom effect video from a single image using FFmpeg's zoompan filter.
-    
-    Parameters:
-        image_file (str): Path to the input image.
-        output_video (str): Path for the output video.
-        duration (int|float): Desired duration of the video in seconds.
-        fps (int): Frame rate of the output video.
-        zoom_limit (float): Maximum zoom factor.
-        resolution (str): Output resolution as "widthxheight" (e.g., "1280x720").
-    """
-    
-    # The number of frames determines how long each zoom step lasts.
-    # 'd' in zoompan is set to the number of frames per zoom step.
-    total_frames = int(duration * fps)
-    # Experiment with the zoom speed. Here, the expression increases zoom until it reaches zoom_limit.
-    zoom_expr = f"min(zoom+0.0015,{zoom_limit})"
-    # Build the zoompan filter. Force the original aspect ratio to decrease if needed.
-    vf_filter = f"zoompan=z='{zoom_expr}':x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':d={total_frames}:s={resolution},fps={fps}"
-    
-    cmd = [
-        "ffmpeg", "-y",
-        "-loop", "1",                # Loop the image infinitely.
-        "-i", image_file,
-        "-vf", vf_filter,
-        "-c:v", "libx264",           
-        "-t", str(duration),         # Set the video duration.
-        "-pix_fmt", "yuv420p",       # Ensure broad playback compatibility.
-        output_video
-    ]
-    
-    run_subprocess(cmd, check=True)
-    
-# Example usage:
-# create_zoom_video("image.jpg", "output_zoom.mp4", duration=10, fps=30, zoom_limit=1.5, resolution="1280x720")
-
 # Locate source images and voice-over files
 image_files = []
-for filename in os.listdir(image_dir):
-    if filename.lower().endswith('.png') and 'ComfyUITikTok' in filename:
-        image_files.append(os.path.join(image_dir, filename))
-image_files.sort()
+prerendered_clips = {}
+handoff_dir = os.path.join(image_dir, "handoff")
+# Frames left behind by a crashed or earlier run belong to other prompts and are ignored
+handoff_frames = read_manifest(handoff_dir, run_id_for(os.path.join(parent_dir, "promptCheck.txt")))
+if handoff_frames is None and os.path.isdir(handoff_dir):
+    logger.warning(f"Ignoring handoff frames in {handoff_dir}: not a complete set for the current prompts")
+if args.clips_manifest:
+    # Images and their clips were produced by the pipelined runner, in order
+    with open(args.clips_manifest, "r", encoding="utf-8") as f:
+        clips_manifest = json.load(f)
+    for entry in sorted(clips_manifest.get("clips", []), key=lambda e: e["index"]):
+        if entry.get("clip") and os.path.exists(entry["clip"]):
+            prerendered_clips[entry["image"]] = entry
+        image_files.append(entry["image"])
+    logger.info(f"Loaded {len(image_files)} images ({len(prerendered_clips)} pre-rendered clips) from {args.clips_manifest}")
+elif handoff_frames is not None:
+    # Frames handed off by the generator, already in order
+    image_files = handoff_frames
+    logger.info(f"Loaded {len(image_files)} frames from handoff manifest in {handoff_dir}")
+else:
+    for filename in os.listdir(image_dir):
+        if filename.lower().endswith('.png') and 'ComfyUITikTok' in filename:
+            image_files.append(os.path.join(image_dir, filename))
+    image_files.sort()
 logger.info(f"Found {len(image_files)} image files.")
 
-# Get all audio files
-audio_files = []
-for filename in os.listdir(audio_dir):
-    if filename.lower().endswith('.wav'):
-        audio_files.append(os.path.join(audio_dir, filename))
-audio_files.sort()
-if not audio_files:
-    raise FileNotFoundError("No voice-over files found.")
-logger.info(f"Found {len(audio_files)} audio files.")
-
-# Get the total duration of all audio files
-total_audio_duration = 0
-audio_durations = []
-for audio in audio_files:
-    result = run_subprocess([
-        "ffprobe", "-v", "error", "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1", audio
-    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    audio_duration = float(result.stdout.strip())
-    audio_durations.append(audio_duration)
-    total_audio_duration += audio_duration
+# Ordered (image, weight) clips; the prompt plan lets adjacent paragraphs share an image
+clip_plan = [(image_file, 1) for image_file in image_files]
+prompt_plan = load_plan(os.path.join(parent_dir, "prompt_plan.json"), len(image_files),
+                        run_id_for(os.path.join(parent_dir, "promptCheck.txt")))
+if prompt_plan:
+    clip_plan = [(image_files[segment["image"]], segment["paragraphs"]) for segment in prompt_plan["segments"]]
+    logger.info(f"Using prompt plan: {len(clip_plan)} clips for {len(image_files)} distinct images")
+total_clip_weight = sum(weight for _, weight in clip_plan)
+
+audio_stream = None
+if args.audio_stream:
+    # Sentence audio comes from the TTS stream; durations are exact sample counts
+    audio_stream = AudioStreamReader(args.audio_stream)
+    if not audio_stream.wait(timeout=600):
+        raise TimeoutError(f"Audio stream was not completed: {args.audio_stream}")
+    stream_durations = audio_stream.durations()
+    if not stream_durations:
+        raise FileNotFoundError("No voice-over audio in the stream.")
+    sentence_manifest = read_sentence_manifest(args.audio_stream)
+    audio_indexes = [index for index, _ in stream_durations]
+    audio_files = [f"{args.audio_stream}#{index}" for index in audio_indexes]
+    audio_durations = [duration for _, duration in stream_durations]
+    total_audio_duration = sum(audio_durations)
+    logger.info(f"Found {len(audio_files)} sentences in audio stream.")
+else:
+    sentence_manifest = read_sentence_manifest(audio_dir)
+    if sentence_manifest is not None:
+        # Only the WAVs TTSCaller wrote for this narration (TTS_<index>.wav), in sentence order
+        audio_indexes = []
+        audio_files = []
+        known_durations = {}
+        for entry in sentence_manifest:
+            path = os.path.join(audio_dir, f"TTS_{entry['index']:04d}.wav")
+            if os.path.isfile(path):
+                audio_indexes.append(entry["index"])
+                audio_files.append(path)
+                if "duration" in entry:
+                    known_durations[path] = entry["duration"]
+    else:
+        # Get all audio files
+        audio_indexes = None
+        audio_files = []
+        known_durations = {}
+        for filename in os.listdir(audio_dir):
+            if filename.lower().endswith('.wav'):
+                audio_files.append(os.path.join(audio_dir, filename))
+        audio_files.sort()
+    if not audio_files:
+        raise FileNotFoundError("No voice-over files found.")
+    logger.info(f"Found {len(audio_files)} audio files.")
+
+    # Get the total duration of all audio files (TTSCaller records them in the sentence manifest)
+    total_audio_duration = 0
+    audio_durations = []
+    for audio in audio_files:
+        if audio in known_durations:
+            audio_durations.append(known_durations[audio])
+            total_audio_duration += known_durations[audio]
+            continue
+        result = run_subprocess([
+            "ffprobe", "-v", "error", "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1", audio
+        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        audio_duration = float(result.stdout.strip())
+        audio_durations.append(audio_duration)
+        total_audio_duration += audio_duration
 
 logger.info(f"Total audio duration: {total_audio_duration:.3f} seconds")
 
-def process_image(image_file, idx):
-    logger.info(f"Processing image {idx+1}/{len(image_files)}: {image_file}")
+def process_image(image_file, idx, weight=1):
+    """Render the zoom clip for one image and return its path."""
+    logger.info(f"Processing image {idx+1}/{len(clip_plan)}: {image_file}")
     
     try:
         # Use calculated duration for this specific clip
-        clip_duration = total_audio_duration/len(image_files)
+        clip_duration = total_audio_duration * weight / total_clip_weight
+
+        # Pre-rendered clips are longer than needed and get trimmed to the exact frame count
+        prerendered = prerendered_clips.get(image_file)
+        if prerendered and prerendered["duration"] >= clip_duration:
+            logger.info(f"Reusing pre-rendered clip: {prerendered['clip']}")
+            clip_video = os.path.join(temp_dir, f"clip_{idx:03d}.mp4")
+            trim_clip(prerendered["clip"], clip_video, clip_duration, fps=CLIP_FPS)
+            return clip_video
         
         # Create a temporary folder for this clip
         clip_frames_dir = os.path.join(temp_dir, f"clip_{idx:03d}")
@@ -216,25 +262,15 @@ def process_image(image_file, idx):
         
         # Define output path for the zoom video clip
         clip_video = os.path.join(temp_dir, f"clip_{idx:03d}.mp4")
-        if args.add_minigame=="True":
-            # Create the zoom video directly using FFmpeg
-            create_zoom_video(
-                image_file=image_file,
-                output_video=clip_video,
-                duration=clip_duration, # pyright: ignore[reportArgumentType]
-                fps=60,
-                zoom_limit=zoom_factor,  # Using the zoom_factor from config # pyright: ignore[reportArgumentType]
-                resolution="1280x960"
-            )
-        else:
-            create_zoom_video(
-                image_file=image_file,
-                output_video=clip_video,
-                duration=clip_duration, # pyright: ignore[reportArgumentType]
-                fps=60,
-                zoom_limit=zoom_factor,  # Using the zoom_factor from config # pyright: ignore[reportArgumentType]
-                resolution="1280x1920"
-            )
+        # Create the zoom video directly using FFmpeg
+        create_zoom_video(
+            image_file=image_file,
+            output_video=clip_video,
+            duration=clip_duration, # pyright: ignore[reportArgumentType]
+            fps=CLIP_FPS,
+            zoom_limit=zoom_factor,  # Using the zoom_factor from config # pyright: ignore[reportArgumentType]
+            resolution=clip_resolution(args.add_minigame == "True")
+        )
             
         logger.info(f"Created zoom clip: {clip_video}")
         return clip_video
@@ -248,7 +284,7 @@ def process_image(image_file, idx):
 # Replace the ThreadPoolExecutor with sequential processing
 clip_videos = []
 logger.info("Processing images sequentially to avoid memory errors...")
-for idx, img in enumerate(image_files):
+for idx, (img, weight) in enumerate(clip_plan):
     # Force cleanup before processing each image
     import gc
     gc.collect()
@@ -256,7 +292,7 @@ for idx, img in enumerate(image_files):
         torch.cuda.empty_cache()
     
     # Process one image at a time
-    clip_video = process_image(img, idx)
+    clip_video = process_image(img, idx, weight)
     if clip_video:
         clip_videos.append(clip_video)
     
@@ -271,7 +307,7 @@ if not clip_videos:
 # Concatenate all clip videos using FFmpeg concat demuxer
 concat_list = os.path.join(temp_dir, "concat_list.txt")
 with open(concat_list, "w", encoding="utf-8") as f:
-    for clip in sorted(clip_videos):
+    for clip in clip_videos:
         # Use forward slashes in the file path for FFmpeg
         f.write(f"file '{clip.replace(os.sep, '/')}'\n")
 temp_video = os.path.join(temp_dir, "temp_video.mp4")
@@ -286,21 +322,25 @@ logger.info("Concatenated clips into video: %s", temp_video)
 # Concatenate all audio files and add to the concatenated video
 temp_audio_concat = os.path.join(temp_dir, "audio_combined.wav")
 
-# Create a file list for audio concatenation
-audio_concat_list = os.path.join(temp_dir, "audio_concat_list.txt")
-with open(audio_concat_list, "w", encoding="utf-8") as f:
-    for audio in audio_files:
-        # Use forward slashes in the file path for FFmpeg
-        f.write(f"file '{audio.replace(os.sep, '/')}'\n")
-
-# Concatenate all audio files
-ffmpeg_audio_concat = [
-    "ffmpeg", "-y", "-f", "concat", "-safe", "0",
-    "-i", audio_concat_list,
-    "-c", "copy", temp_audio_concat
-]
-run_subprocess(ffmpeg_audio_concat, check=True)
-logger.info("Concatenated audio files: %s", temp_audio_concat)
+if audio_stream is not None:
+    write_wav(temp_audio_concat, audio_stream.combined(), audio_stream.sample_rate)
+    logger.info("Assembled audio from stream: %s", temp_audio_concat)
+else:
+    # Create a file list for audio concatenation
+    audio_concat_list = os.path.join(temp_dir, "audio_concat_list.txt")
+    with open(audio_concat_list, "w", encoding="utf-8") as f:
+        for audio in audio_files:
+            # Use forward slashes in the file path for FFmpeg
+            f.write(f"file '{audio.replace(os.sep, '/')}'\n")
+
+    # Concatenate all audio files
+    ffmpeg_audio_concat = [
+        "ffmpeg", "-y", "-f", "concat", "-safe", "0",
+        "-i", audio_concat_list,
+        "-c", "copy", temp_audio_concat
+    ]
+    run_subprocess(ffmpeg_audio_concat, check=True)
+    logger.info("Concatenated audio files: %s", temp_audio_concat)
 
 # Add the concatenated audio to the video
 temp_video_audio = os.path.join(temp_dir, "temp_video_with_audio.mp4")
@@ -336,22 +376,33 @@ def write_srt_file(subtitle_timings, output_file):
     
     logger.info(f"Generated fixed SRT subtitles: {output_file}")
 
-def split_into_sentences(text):
-    """Split text into sentences based on common sentence ending punctuation."""
-    # Split on period, exclamation mark, or question mark followed by space or end of string
-    sentences = re.split(r'(?<=[.!?])\s+|(?<=[.!?])$', text)
-    # Remove empty sentences
-    sentences = [s.strip() for s in sentences if s.strip()]
-    return sentences
+def generate_srt_from_audio_files(text_file, audio_files, audio_durations, output_srt,
+                                  sentence_manifest=None, audio_indexes=None):
+    """Generate SRT with timing based on individual audio file durations.
+
+    With a sentence manifest from TTSCaller, each audio segment is matched to
+    its sentence by index, so a sentence that failed to synthesize is left out
+    without shifting the ones after it.
+    """
+    if sentence_manifest is not None and audio_indexes is not None:
+        texts = {entry["index"]: entry["text"] for entry in sentence_manifest}
+        missing = len(texts) - len(audio_indexes)
+        if missing:
+            logger.warning(f"{missing} sentence(s) have no audio and get no subtitle")
+        subtitle_timings = []
+        start_time = 0.0
+        for index, duration in zip(audio_indexes, audio_durations):
+            subtitle_timings.append((start_time, start_time + duration, texts[index]))
+            start_time += duration
+        write_srt_file(subtitle_timings, output_srt)
+        return output_srt
 
-def generate_srt_from_audio_files(text_file, audio_files, audio_durations, output_srt):
-    """Generate SRT with timing based on individual audio file durations."""
     # Read the entire text content
     with open(text_file, "r", encoding="utf-8") as f:
         content = f.read()
     
     # Split the content into sentences
-    sentences = split_into_sentences(content)
+    sentences = split_sentences(content)
     
     # Ensure we have the same number of sentences and audio files
     if len(sentences) != len(audio_files):
@@ -380,7 +431,8 @@ def generate_srt_from_audio_files(text_file, audio_files, audio_durations, outpu
     return output_srt
 
 # Generate fixed subtitles
-generate_srt_from_audio_files(subtitles_txt, audio_files, audio_durations, srt_file)
+generate_srt_from_audio_files(subtitles_txt, audio_files, audio_durations, srt_file,
+                              sentence_manifest=sentence_manifest, audio_indexes=audio_indexes)
 srt_ffmpeg = srt_file.replace("\\", "/")
 temp_video_subs = os.path.join(temp_dir, "temp_video_with_subs.mp4")
 
@@ -595,15 +647,26 @@ for filename in os.listdir(image_dir):
             logger.info(f"Deleted image file: {file_path}")
         except Exception as e:
             logger.warning(f"Failed to delete image file {file_path}: {str(e)}")
+if os.path.isdir(handoff_dir):
+    shutil.rmtree(handoff_dir, ignore_errors=True)
+    logger.info(f"Deleted handoff frames: {handoff_dir}")
 logger.info("Cleared Image dir!")
 
-# Delete WAV files from the audio directory (audio_dir may be same as image_dir)
-for filename in os.listdir(audio_dir):
-    file_path = os.path.join(audio_dir, filename)
-    if filename.lower().endswith('.wav') and os.path.isfile(file_path):
-        try:
-            os.remove(file_path)
-            logger.info(f"Deleted audio file: {file_path}")
-        except Exception as e:
-            logger.warning(f"Failed to delete audio file {file_path}: {str(e)}")
-logger.info("Cleared Audio dir!")
\ No newline at end of file
+if audio_stream is not None:
+    # Only the stream belongs to this run; leave other files in the output dir alone
+    remove_stream(args.audio_stream, [SENTENCE_MANIFEST_NAME])
+    logger.info(f"Deleted audio stream: {args.audio_stream}")
+else:
+    # Delete WAV files from the audio directory (audio_dir may be same as image_dir)
+    for filename in os.listdir(audio_dir):
+        file_path = os.path.join(audio_dir, filename)
+        if filename.lower().endswith('.wav') and os.path.isfile(file_path):
+            try:
+                os.remove(file_path)
+                logger.info(f"Deleted audio file: {file_path}")
+            except Exception as e:
+                logger.warning(f"Failed to delete audio file {file_path}: {str(e)}")
+    manifest_path = os.path.join(audio_dir, SENTENCE_MANIFEST_NAME)
+    if os.path.isfile(manifest_path):
+        os.remove(manifest_path)
+    logger.info("Cleared Audio dir!")
\ No newline at end of file
@@ -1,19 +1,33 @@
-import nltk
-from nltk.tokenize import sent_tokenize
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.tag import pos_tag
 import random
-# Download required NLTK data
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('stopwords')
 import logging
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from helper import setup_script_logging
+from keywords import KeywordExtractor
+from prompt_planner import DEFAULT_SIMILARITY_THRESHOLD, plan_prompts, save_plan
+from frame_handoff import run_id_for
 logger = setup_script_logging(__name__)
+
+
+def read_config_value(key, default):
+    """Read key= from CONFIG.txt, returning default when it is missing or empty."""
+    try:
+        with open('CONFIG.txt', 'r', encoding='utf-8') as config_file:
+            for line in config_file:
+                if line.strip().startswith(f'{key}='):
+                    return line.strip().split('=', 1)[1].strip().strip('"\'') or default
+    except FileNotFoundError:
+        pass
+    return default
+
+
+# "fast" (no downloads) or "nltk"
+keyword_backend = read_config_value('keyword_backend', 'fast').lower()
+# Paragraphs whose prompts are at least this similar share one image
+prompt_similarity_threshold = float(read_config_value('prompt_similarity_threshold', DEFAULT_SIMILARITY_THRESHOLD))
+# Cap on distinct images per video (0 = no cap)
+max_images_per_video = int(read_config_value('max_images_per_video', 0))
 # Read styles from the default_styles.txt file
 styles = []
 try:
@@ -42,9 +56,31 @@ except FileNotFoundError:
 
 
 
-def extract_key_info(text):
+_nltk_ready = False
+
+
+def _ensure_nltk():
+    """Import NLTK and fetch its corpora only if they are not installed yet."""
+    global _nltk_ready
+    import nltk
+    if not _nltk_ready:
+        for resource, package in (("tokenizers/punkt_tab", "punkt_tab"),
+                                  ("corpora/stopwords", "stopwords"),
+                                  ("taggers/averaged_perceptron_tagger_eng", "averaged_perceptron_tagger_eng")):
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                nltk.download(package)
+        _nltk_ready = True
+    return nltk
+
+
+def extract_key_info_nltk(text):
+    nltk = _ensure_nltk()
+    from nltk.corpus import stopwords
+
     # Tokenize the text into sentences
-    sentences = sent_tokenize(text)
+    sentences = nltk.sent_tokenize(text)
     
     # Use the first sentence as it often contains the most important information
     if not sentences:
@@ -53,22 +89,33 @@ def extract_key_info(text):
     
     # Tokenize words and remove stopwords
     stop_words = set(stopwords.words('english'))
-    words = word_tokenize(first_sentence)
+    words = nltk.word_tokenize(first_sentence)
     filtered_words = [word.lower() for word in words if word.isalnum() and word.lower() not in stop_words]
     
     # Get part-of-speech tags
-    nltk.download('averaged_perceptron_tagger_eng')
-    pos_tags = pos_tag(filtered_words)
+    pos_tags = nltk.pos_tag(filtered_words)
     
     # Extract nouns and verbs
     key_words = [word for word, pos in pos_tags if pos.startswith('NN') or pos.startswith('VB')]
     
     return ' '.join(key_words)
 
+
+def extract_key_info(text, extractor=None):
+    if keyword_backend == "nltk":
+        return extract_key_info_nltk(text)
+    if extractor is None:
+        extractor = KeywordExtractor([text])
+    return ' '.join(extractor.extract(text))
+
   
-def create_image_prompt(text, style):
-    key_info = extract_key_info(text)
-    prompt = f"{key_info}, {style} style"
+def format_image_prompt(key_info, style):
+    return f"{key_info}, {style} style"
+
+
+def create_image_prompt(text, style, extractor=None):
+    key_info = extract_key_info(text, extractor)
+    prompt = format_image_prompt(key_info, style)
     return prompt
 
 
@@ -80,20 +127,27 @@ def main():
     with open('processed.txt', 'r', encoding='utf-8') as news_file:
         news_text = news_file.read()
 
+    paragraphs = [p for p in news_text.split('\n\n') if p.strip()]
+    paragraphs = [p for p in paragraphs if not (p.startswith(' ') or p.startswith(','))]
+    extractor = KeywordExtractor(paragraphs)
+    key_infos = [extract_key_info(paragraph, extractor) for paragraph in paragraphs]
+
+    # Merge near-duplicate paragraphs so each distinct image is generated once
+    plan = plan_prompts(key_infos, threshold=prompt_similarity_threshold,
+                        max_images=max_images_per_video or None)
+
     with open('promptCheck.txt', 'w', encoding='utf-8') as file:
-        paragraphs = [p for p in news_text.split('\n\n') if p.strip()]
-        for paragraph in paragraphs:
-            if paragraph.startswith(' ') or paragraph.startswith(',') or (paragraph is None):
-                continue
-            image_prompt = create_image_prompt(paragraph, style=random.choice(styles))
-            if image_prompt[0]!=',' or image_prompt[0]!=' ':
-                file.write(image_prompt + '\n')
-                prompts.append(image_prompt)
-            else:
-                print("Prompt starts with a comma, skipping this prompt.")
-                continue
+        for paragraph_index in plan["representatives"]:
+            image_prompt = format_image_prompt(key_infos[paragraph_index], random.choice(styles))
+            file.write(image_prompt + '\n')
+            prompts.append(image_prompt)
             logger.info(image_prompt)
 
+    # The plan only applies to the images generated from these prompts
+    plan["run_id"] = run_id_for('promptCheck.txt')
+    save_plan(plan, 'prompt_plan.json')
+    logger.info(f"Planned {len(prompts)} images for {len(paragraphs)} paragraphs")
+
     return prompts if prompts else None
 
 if __name__ == "__main__":
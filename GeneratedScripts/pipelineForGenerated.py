@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Pipelined runner for speech synthesis, image generation and zoom clip rendering.
+
+TTSCaller runs in a background worker while images are generated in-process,
+streaming sentence audio into a private directory the editor reads directly.
+Every saved image is pushed onto a queue and its zoom clip starts rendering
+immediately, so the three stages overlap instead of running back to back.
+The editor is then started with a manifest of the pre-rendered clips.
+"""
+import argparse
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(SCRIPT_DIR))
+from helper import setup_script_logging, run_subprocess
+from clip_render import CLIP_FPS, clip_resolution, create_zoom_video, estimate_speech_duration
+from prompt_planner import load_plan
+from frame_handoff import run_id_for
+from tts_backends import BACKENDS
+
+logger = setup_script_logging('Pipeline')
+
+# Clips are rendered longer than the estimate and trimmed by the editor
+CLIP_DURATION_MARGIN = 1.5
+
+
+def read_zoom_factor(config_file: str, default: float = 1.25) -> float:
+    """Read zoom_factor from CONFIG.txt, falling back to the editor's default."""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip().startswith('zoom_factor='):
+                    return float(line.strip().split('=', 1)[1].strip().strip('"\''))
+    except Exception as e:
+        logger.warning(f"Error reading zoom factor from {config_file}: {e}")
+    return default
+
+
+def run_tts(text_file: str, voice: str, vibe: str, stream_dir: str, results: dict, tts_args=()) -> None:
+    """Run TTSCaller.py streaming into stream_dir and record its return code in results."""
+    started = time.perf_counter()
+    cmd = [sys.executable, os.path.join(SCRIPT_DIR, "TTSCaller.py"),
+           "--text-file", text_file, "--voice", voice, "--vibe", vibe, "--stream-out", stream_dir, *tts_args]
+    try:
+        results["returncode"] = run_subprocess(cmd).returncode
+    except Exception as e:
+        logger.error(f"TTS worker failed: {e}")
+        results["returncode"] = -1
+    results["seconds"] = time.perf_counter() - started
+    logger.info(f"TTS finished in {results['seconds']:.1f}s with code {results['returncode']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Generate speech, images and zoom clips concurrently, then edit the video.')
+    parser.add_argument('--add-minigame', choices=['True', 'False'], default='False', help='Layout the video for a stacked minigame (True/False)')
+    parser.add_argument('--text-file', default='processed.txt', help='Narration text (default: processed.txt)')
+    parser.add_argument('--voice', required=True)
+    parser.add_argument('--vibe', default='---')
+    parser.add_argument('--tts-backend', choices=BACKENDS, default='openaifm', help='TTSCaller speech backend')
+    parser.add_argument('--tts-backend-url', default=None, help='Endpoint of the http TTS backend')
+    parser.add_argument('--tts-postprocess', action='store_true', help='Trim sentence silence and match loudness')
+    parser.add_argument('--clip-workers', type=int, default=2, help='Number of zoom clips rendered in parallel')
+    parser.add_argument('--skip-edit', action='store_true', help='Stop after the clips are rendered')
+    # Unknown options (e.g. --low-memory) are read by the image generator
+    args, _ = parser.parse_known_args()
+
+    started = time.perf_counter()
+    text_file = os.path.abspath(args.text_file)
+    with open(text_file, 'r', encoding='utf-8') as f:
+        narration = f.read()
+
+    tts_results = {}
+    stream_dir = tempfile.mkdtemp(prefix="tts_stream_")
+    clips_dir = None
+    keep_outputs = False
+    tts_args = ["--backend", args.tts_backend]
+    if args.tts_backend_url:
+        tts_args += ["--backend-url", args.tts_backend_url]
+    if args.tts_postprocess:
+        tts_args.append("--postprocess")
+    tts_thread = threading.Thread(target=run_tts, args=(text_file, args.voice, args.vibe, stream_dir, tts_results,
+                                                        tts_args), daemon=True)
+    try:
+        tts_thread.start()
+
+        # Importing the generator writes promptCheck.txt and loads the checkpoint
+        sys.path.insert(0, SCRIPT_DIR)
+        import tiktokimagegenForGenerated as imagegen
+
+        prompts = imagegen.get_prompts()
+        if not prompts:
+            logger.error("No image prompts were generated")
+            return 1
+        # Images shared by several paragraphs get proportionally longer clips
+        image_weights = [1] * len(prompts)
+        total_weight = len(prompts)
+        plan = load_plan("prompt_plan.json", len(prompts), run_id_for("promptCheck.txt"))
+        if plan:
+            total_weight = sum(segment["paragraphs"] for segment in plan["segments"])
+            for segment in plan["segments"]:
+                image_weights[segment["image"]] = max(image_weights[segment["image"]], segment["paragraphs"])
+        estimated_speech = estimate_speech_duration(narration)
+        zoom_factor = read_zoom_factor(os.path.join(os.path.dirname(SCRIPT_DIR), "CONFIG.txt"))
+        resolution = clip_resolution(args.add_minigame == 'True')
+
+        clips_dir = os.path.join(imagegen.saveimage.output_dir, "pipeline_clips")
+        shutil.rmtree(clips_dir, ignore_errors=True)
+        os.makedirs(clips_dir, exist_ok=True)
+        imagegen.delete_images_with_prefix("ComfyUITikTok")
+
+        saved_images = queue.Queue()
+        manifest = []
+
+        def render_clip(index: int, image_path: str) -> None:
+            clip_path = os.path.join(clips_dir, f"clip_{index:03d}.mp4")
+            clip_duration = estimated_speech * image_weights[index] / total_weight * CLIP_DURATION_MARGIN
+            entry = {"index": index, "image": image_path, "clip": None, "duration": clip_duration}
+            try:
+                create_zoom_video(image_path, clip_path, duration=clip_duration, fps=CLIP_FPS,
+                                  zoom_limit=zoom_factor, resolution=resolution)
+                entry["clip"] = clip_path
+                logger.info(f"Rendered clip {index + 1}/{len(prompts)}: {clip_path}")
+            except Exception as e:
+                # The editor re-renders any clip missing from the manifest
+                logger.error(f"Failed to render clip for {image_path}: {e}")
+            manifest.append(entry)
+
+        def consume_images() -> None:
+            with ThreadPoolExecutor(max_workers=max(1, args.clip_workers)) as executor:
+                while True:
+                    item = saved_images.get()
+                    if item is None:
+                        break
+                    executor.submit(render_clip, *item)
+
+        consumer = threading.Thread(target=consume_images)
+        consumer.start()
+        try:
+            imagegen.main(on_image_saved=lambda index, path: saved_images.put((index, path)))
+        finally:
+            saved_images.put(None)
+            consumer.join()
+        logger.info(f"Images and clips ready after {time.perf_counter() - started:.1f}s")
+
+        tts_thread.join()
+        if tts_results.get("returncode") != 0:
+            logger.error("Speech generation failed, not editing the video")
+            return 2
+
+        manifest_path = os.path.join(clips_dir, "clips_manifest.json")
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({"clips": sorted(manifest, key=lambda e: e["index"])}, f, indent=2)
+        logger.info(f"Wrote clips manifest: {manifest_path}")
+
+        keep_outputs = args.skip_edit
+        if not args.skip_edit:
+            cmd = [sys.executable, os.path.join(SCRIPT_DIR, "editVideoTestForGenerated.py"),
+                   f"--add-minigame={args.add_minigame}", "--clips-manifest", manifest_path,
+                   "--audio-stream", stream_dir]
+            if run_subprocess(cmd).returncode != 0:
+                logger.error("Video editing failed")
+                return 3
+
+        logger.info(f"Pipeline finished in {time.perf_counter() - started:.1f}s")
+        return 0
+    finally:
+        # The editor deletes the stream once it has read it; anything left is from a failed run.
+        # With --skip-edit the clips and speech are the output and are kept.
+        if keep_outputs:
+            logger.info(f"Kept clips in {clips_dir} and speech in {stream_dir}")
+        else:
+            # TTS may still be writing into the stream after an early return
+            if tts_thread.is_alive():
+                tts_thread.join()
+            shutil.rmtree(stream_dir, ignore_errors=True)
+            if clips_dir:
+                shutil.rmtree(clips_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -7,13 +7,28 @@ from librosa import ex
 import torch
 import subprocess
 import argparse
+import gc
+from contextlib import nullcontext
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from helper import setup_script_logging, run_subprocess
+from memory_budget import RSSMonitor, default_budget_mb, plan_decode
+from frame_handoff import HANDOFF_FORMATS, HandoffWriter, run_id_for
 
 parser=argparse.ArgumentParser(description='Run a series of scripts in sequence.')
 parser.add_argument('--add-minigame', choices=['True', 'False'], default='False', help='Modify the hight of the picture if there is a minigame or not in the video (True/False)')
-args = parser.parse_args()
+parser.add_argument('--low-memory', choices=['auto', 'True', 'False'], default='auto', help='Generate one model part at a time with a tiled VAE decode (default: only without a GPU)')
+parser.add_argument('--rss-budget-mb', type=int, default=0, help='Peak RSS budget for --low-memory in MB (default: 75%% of RAM)')
+parser.add_argument('--rss-report', default=None, help='Write the peak RSS per image to this JSON file')
+parser.add_argument('--handoff', choices=HANDOFF_FORMATS + ('off',), default='off', help='Hand frames to the editor as raw RGB or fast PNG with an ordered manifest instead of ComfyUI PNGs')
+# parse_known_args so the module can be imported by pipelineForGenerated.py
+args, _ = parser.parse_known_args()
+
+if args.low_memory == 'auto':
+    low_memory = not torch.cuda.is_available()
+else:
+    low_memory = args.low_memory == 'True'
+rss_budget_mb = args.rss_budget_mb or default_budget_mb()
 
 
 if args.add_minigame == 'True':
@@ -101,6 +116,7 @@ from nodes import (
     CLIPTextEncode,
     NODE_CLASS_MAPPINGS,
     VAEDecode,
+    VAEDecodeTiled,
     CheckpointLoaderSimple,
     EmptyLatentImage,
     VAELoader,
@@ -110,6 +126,8 @@ from nodes import (
 
 lines = open("promptCheck.txt", "r").read()
 
+NEGATIVE_PROMPT = "text, watermark, ugly face, mutated hands, low res, blurry face, watermark, title, signature,  NegativeDynamics, negative_hand, monochrome, ugly face, names logo, nsfw, faces, nudes, nude, naked, nipples, face, flag, gay, lesbian, homosexuality"
+
 
 emptylatentimage = EmptyLatentImage()
 emptylatentimage_5 = emptylatentimage.generate(
@@ -128,11 +146,156 @@ vaeloader_10 = vaeloader.load_vae(vae_name="sdxl_vae.safetensors")
 ksampler = KSampler()
 vaedecode = VAEDecode()
 saveimage = SaveImage()
-def main():
-    for line in lines.split('\n')[:-1]:
+
+
+def delete_images_with_prefix(prefix: str) -> None:
+    """
+    Deletes all images in the current directory that have the given prefix.
+    """
+    comfyui_dir = find_path("ComfyUI")
+    if comfyui_dir is None:
+        logger.error("ComfyUI folder not found")
+        raise Exception("ComfyUI folder not found")
+    output_dir = os.path.join(comfyui_dir, "output")
+    if not os.path.exists(output_dir):
+        logger.error("Output folder not found at: " + output_dir)
+        raise Exception("Output folder not found at: " + output_dir)
+    for file_name in os.listdir(output_dir):
+        if file_name.startswith(prefix):
+            file_path = os.path.join(output_dir, file_name)  # Get the full path of the file
+            os.remove(file_path)
+            logger.info(f"Deleted image: {file_path}")
+
+
+def get_prompts() -> list:
+    """Return the image prompts in generation order."""
+    return lines.split('\n')[:-1]
+
+
+handoff_writer = None
+
+
+def save_and_notify(images, indices, on_image_saved):
+    """
+    Save a batch of decoded images and call on_image_saved(index, image_path) for each.
+
+    With --handoff the frames go straight to the handoff directory; otherwise
+    they are saved as ComfyUI PNGs.
+    """
+    if handoff_writer is not None:
+        image_paths = [handoff_writer.write(index, image) for index, image in zip(indices, images)]
+    else:
+        saveimage_9 = saveimage.save_images(filename_prefix="ComfyUITikTok", images=images)
+        image_paths = [os.path.join(saveimage.output_dir, saved["subfolder"], saved["filename"])
+                       for saved in saveimage_9["ui"]["images"]]
+    if on_image_saved is not None:
+        for index, image_path in zip(indices, image_paths):
+            on_image_saved(index, image_path)
+
+
+def generate_low_memory(on_image_saved=None, monitor=None):
+    """
+    Generate all images one model part at a time to bound peak RAM on CPU-only nodes.
+
+    Prompts are encoded first and the CLIP weights released. Each latent is then
+    decoded with a tiled VAE decode and saved as soon as it has been sampled, so
+    clip rendering can overlap with generation; the VAE is small next to the
+    UNet and stays resident alongside it. The tile size is planned once the UNet
+    is loaded, so the decode fits the RSS budget left next to it.
+    """
+    global checkpointloadersimple_4
+    import comfy.model_management
+
+    def track(*labels):
+        return monitor.track(*labels) if monitor else nullcontext()
+
+    def release():
+        comfy.model_management.unload_all_models()
+        gc.collect()
+        comfy.model_management.soft_empty_cache()
+
+    prompts = get_prompts()
+    model = get_value_at_index(checkpointloadersimple_4, 0)
+    clip = get_value_at_index(checkpointloadersimple_4, 1)
+    # Keep only local references so each model part can be freed after its stage
+    checkpointloadersimple_4 = None
+
+    with torch.inference_mode():
+        cliptextencode = CLIPTextEncode()
+        with track("encode"):
+            negative = get_value_at_index(cliptextencode.encode(text=NEGATIVE_PROMPT, clip=clip), 0)
+            positives = [get_value_at_index(cliptextencode.encode(text=line, clip=clip), 0) for line in prompts]
+        del clip
+        release()
+
+        vaedecodetiled = VAEDecodeTiled()
+        tile_size = None
+        for index, line in enumerate(prompts):
+            logger.info("Generated Image Prompt: " + line)
+            with track(f"image_{index:03d}"):
+                ksampler_3 = ksampler.sample(
+                    seed=random.randint(1, 2**64),
+                    steps=20,
+                    cfg=2.0,
+                    sampler_name="dpmpp_3m_sde",
+                    scheduler="karras",
+                    denoise=1,
+                    model=model,
+                    positive=positives[index],
+                    negative=negative,
+                    latent_image=get_value_at_index(emptylatentimage_5, 0),
+                )
+                if tile_size is None:
+                    # The UNet is resident after the first sample; the decode gets what is left of the budget
+                    tile_size, _ = plan_decode(rss_budget_mb, 1280, picture_hight, max_batch_size=1)
+                    logger.info(f"Tiled VAE decode with tile size {tile_size} for a {rss_budget_mb} MB budget")
+                vaedecode_8 = vaedecodetiled.decode(
+                    samples=get_value_at_index(ksampler_3, 0),
+                    vae=get_value_at_index(vaeloader_10, 0),
+                    tile_size=tile_size,
+                    overlap=max(32, tile_size // 8),
+                )
+                save_and_notify(get_value_at_index(vaedecode_8, 0), [index], on_image_saved)
+            del ksampler_3, vaedecode_8
+            gc.collect()
+        del model
+        release()
+
+
+def main(on_image_saved=None):
+    """
+    Generate one image per prompt.
+
+    Args:
+        on_image_saved: Optional callback called as on_image_saved(index, image_path)
+            as soon as each image is written, so clip rendering can start early.
+    """
+    global handoff_writer
+    if args.handoff != 'off':
+        handoff_writer = HandoffWriter(os.path.join(saveimage.output_dir, "handoff"), args.handoff,
+                                       run_id=run_id_for("promptCheck.txt"))
+    monitor = RSSMonitor().start() if args.rss_report else None
+    try:
+        if low_memory:
+            logger.info("Using memory-bounded generation")
+            generate_low_memory(on_image_saved, monitor)
+        else:
+            generate_standard(on_image_saved, monitor)
+        if handoff_writer is not None:
+            handoff_writer.close()
+    finally:
+        if monitor:
+            monitor.stop()
+            for label, peak in monitor.report(args.rss_report).items():
+                logger.info(f"Peak RSS {label}: {peak:.1f} MB")
+
+
+def generate_standard(on_image_saved=None, monitor=None):
+    """Generate the images one prompt at a time with all models resident."""
+    for index, line in enumerate(get_prompts()):
         logger.info("Generated Image Prompt: " + line)
 
-        with torch.inference_mode():
+        with torch.inference_mode(), (monitor.track(f"image_{index:03d}") if monitor else nullcontext()):
            
 
 
@@ -143,7 +306,7 @@ def main():
             )
 
             cliptextencode_7 = cliptextencode.encode(
-                text="text, watermark, ugly face, mutated hands, low res, blurry face, watermark, title, signature,  NegativeDynamics, negative_hand, monochrome, ugly face, names logo, nsfw, faces, nudes, nude, naked, nipples, face, flag, gay, lesbian, homosexuality",
+                text=NEGATIVE_PROMPT,
                 clip=get_value_at_index(checkpointloadersimple_4, 1),
             )
         
@@ -165,29 +328,9 @@ def main():
                 vae=get_value_at_index(vaeloader_10, 0),
             )
 
-            saveimage_9 = saveimage.save_images(
-                filename_prefix="ComfyUITikTok", images=get_value_at_index(vaedecode_8, 0)
-            )
+            save_and_notify(get_value_at_index(vaedecode_8, 0), [index], on_image_saved)
 
 
 if __name__ == "__main__":
-    def delete_images_with_prefix(prefix: str) -> None:
-        """
-        Deletes all images in the current directory that have the given prefix.
-        """
-        comfyui_dir = find_path("ComfyUI")
-        if comfyui_dir is None:
-            logger.error("ComfyUI folder not found")
-            raise Exception("ComfyUI folder not found")
-        output_dir = os.path.join(comfyui_dir, "output")
-        if not os.path.exists(output_dir):
-            logger.error("Output folder not found at: " + output_dir)
-            raise Exception("Output folder not found at: " + output_dir)
-        for file_name in os.listdir(output_dir):
-            if file_name.startswith(prefix):
-                file_path = os.path.join(output_dir, file_name)  # Get the full path of the file
-                os.remove(file_path)
-                logger.info(f"Deleted image: {file_path}")
-
     delete_images_with_prefix("ComfyUITikTok")
     main()
@@ -1,18 +1,33 @@
-import requests
-from bs4 import BeautifulSoup
 import re
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from googlesearch import search
-from openai import OpenAI
 import sys
 from googletrans import Translator
 import asyncio
-import subprocess
-from helper import run_subprocess
-client = OpenAI(base_url='http://localhost:1234/v1', api_key="Nothing here")
+from news_fetch import fetch_all, normalize_url
+from http_cache import HTTPCache
+import html_extract
+from token_budget import CONTEXT_TOKENS, chunk_budget, count_tokens, map_reduce, summarize
+from llm_client import LLMClient
+from llm_cache import LLMCache
+from lms_lifecycle import ensure_model
+from sentence_stream import SentenceStreamWriter
+from near_dup import collapse_duplicates
+from relevance import filter_relevant, rank
+# Every LLM request goes through one limiter sized to the server's parallel slots. Answers are cached
+# on disk; --no-llm-cache (or LLM_CACHE=off) asks the model again and refreshes them.
+NO_LLM_CACHE_FLAG = "--no-llm-cache"
+# The server and model are only started and loaded, if they are not up yet, once a request misses the cache;
+# LM Studio unloads the model after an idle TTL.
+llm = LLMClient(cache=LLMCache(bypass=True if NO_LLM_CACHE_FLAG in sys.argv else None),
+                prepare=lambda: ensure_model("cognitivecomputations/Dolphin3.0-Llama3.1-8B-GGUF/Dolphin3.0-Llama3.1-8B-Q3_K_S.gguf"))
+# Pages are shared between queries and the additional-data round, and across runs
+page_cache = HTTPCache()
+SUMMARY_MARKER = "Summary:"
+# The narration waits for the marker at most until the first sentence is complete or this much text has arrived
+MAX_PREAMBLE_CHARS = 400
+SENTENCE_END = re.compile(r'[.!?]["\')\]]*\s')
 
-run_subprocess("lms server start")
-run_subprocess("lms load cognitivecomputations/Dolphin3.0-Llama3.1-8B-GGUF/Dolphin3.0-Llama3.1-8B-Q3_K_S.gguf --context-length 8096 --gpu max")
 def analyze_text_content(text, url):
     print(f"Analyzing text from: {url}")
     # Extract the source: the substring after "https://" until the first "."
@@ -22,73 +37,88 @@ def analyze_text_content(text, url):
     else:
         match = re.search(r'https://([^\.\/]+)', url)
         source = match.group(1) if match else "Unknown"
-    completions = client.chat.completions.create(
-        model="dolphin3.0-llama3.1-8b@q3_k_s",
-        messages=[
-            {"role": "system", "content": f"Analyze this text from the source {source} and provide the entire article correctly formatted excluding other text that is not article related: {text}, \n Your Output must be in english!"}
-        ],
-        stream=False
-    )
-    return source, completions.choices[0].message.content
 
-def extract_all_text(url):
-    if not url.startswith("https://"):
-        url = "https://" + url
-    response = requests.get(url)
-    response.raise_for_status()  # Raises an HTTPError for bad responses
-    soup = BeautifulSoup(response.text, "html.parser")
+    def prompt(chunk):
+        return f"Analyze this text from the source {source} and provide the entire article correctly formatted excluding other text that is not article related: {chunk}, \n Your Output must be in english!"
+
+    def analyze_chunk(chunk):
+        return llm.chat([{"role": "system", "content": prompt(chunk)}])
+
+    # Long articles are analyzed in sentence-aligned parts that fit the context together with the reply
+    budget = chunk_budget(prompt(""))
+    return source, map_reduce(text, analyze_chunk, max_tokens=budget)
 
-    text = " ".join([p.get_text() for p in soup.find_all('p')])
-    # Extract sentences that start with a capital letter and end with ., !, or ?
-    sentences = re.findall(r'([A-Z][^\.!?]*[\.!?])', text)
-    # Remove lines that have less than 5 words
-    filtered_sentences = [sentence for sentence in sentences if len(sentence.split()) >= 5]
-    print(f"Extracted sentences from {url}: {filtered_sentences}")
-    return "\n".join(filtered_sentences)
+def fit_analyses(analyses, budget=CONTEXT_TOKENS // 2):
+    # The final conversation holds every analysis; condense the longest ones so they fit the budget
+    total = sum(count_tokens(analysis) for analysis in analyses.values())
+    if total <= budget:
+        return analyses
+    share = budget // max(1, len(analyses))
+    print(f"Analyses use {total} tokens, condensing those above {share} tokens")
+    fitted = {}
+    for url, analysis in analyses.items():
+        fitted[url] = summarize(analysis, llm.complete) if count_tokens(analysis) > share else analysis
+    return fitted
 
-def is_relevant(text, query):
-    # Check if there are at least 3 similar words with at least 3 letters between the text and the query
-    query_keywords = set(word for word in query.lower().split() if len(word) >= 3)
-    text_words = set(word for word in text.lower().split() if len(word) >= 3)
-    common_words = query_keywords.intersection(text_words)
-    print(f"Common words: {common_words}")
-    return len(common_words) >= 3
+def extract_text(html, url):
+    text = html_extract.extract_text(html)
+    print(f"Extracted sentences from {url}: {text.splitlines()}")
+    return text
+
+def extract_all_text(url):
+    url = normalize_url(url)
+    page = fetch_all([url], cache=page_cache)[url]
+    if not page.ok:
+        raise RuntimeError(page.error)
+    return extract_text(page.text, url)
 
 def google_search_extract(query, num_results=20):
     # Use google search to get a list of links for the query, excluding YouTube links
     print(f"Searching for: {query}")
     links = [link for link in search(term=query, num_results=num_results, sleep_interval=2) if "youtube.com" not in link and any(len(word) >= 3 and word in link for word in query.split())] # pyright: ignore[reportOperatorIssue]
     print(f"Found {len(links)} links")
+    extracted = {}
+    # One pooled async session fetches every page; parsing happens as results are read
+    pages = fetch_all(links, cache=page_cache)
+    for url, page in pages.items():
+        try:
+            if not page.ok:
+                raise RuntimeError(page.error)
+            extracted[url] = extract_text(page.text, url)
+        except Exception as e:
+            print(f"Failed to extract text from: {url} with error: {e}")
+    page_cache.save()
+    print(page_cache.summary())
+    # Copies are collapsed first so they cannot fill the top-k slots, then the distinct pages are
+    # ranked together against the query and only the best relevant ones go on to the model
+    candidates = drop_near_duplicates(extracted, query)
     results = {}
-    successful_extractions = 0
-    with ThreadPoolExecutor(max_workers=len(links)) as executor:
-        future_to_url = {executor.submit(extract_all_text, url): url for url in links}
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
-            try:
-                text = future.result()
-                if is_relevant(text, query):
-                    results[url] = text
-                    successful_extractions += 1
-                    print(f"Successfully extracted relevant text from: {url}")
-                    with open("sources.txt", "a") as file:
-                        file.write(f"{url}\n")
-                else:
-                    print(f"Irrelevant text from: {url}")
-                if successful_extractions >= num_results:
-                    break
-            except Exception as e:
-                results[url] = f"Error: {e}"
-                print(f"Failed to extract text from: {url} with error: {e}")
-    return {k: v for k, v in results.items() if not v.startswith("Error:")}
+    for url, score in rank(query, candidates, top_k=num_results):
+        results[url] = candidates[url]
+        print(f"Successfully extracted relevant text from: {url} (score {score:.2f})")
+        with open("sources.txt", "a") as file:
+            file.write(f"{url}\n")
+    for url in candidates.keys() - results.keys():
+        print(f"Irrelevant text from: {url}")
+    return results
+
+def drop_near_duplicates(results, query):
+    # Syndicated copies of the same story would each cost a full LLM analysis
+    kept, replaced = collapse_duplicates(results)
+    for url, copies in replaced.items():
+        print(f"Keeping {url} for its near-duplicates: {copies}")
+    saved = len(results) - len(kept)
+    print(f"Near-duplicates for '{query}': {saved} of {len(results)} pages skipped, {saved} LLM analysis calls saved")
+    return kept
 
 if __name__ == "__main__":
 
-    if len(sys.argv) < 2:
-        print("Usage: python NewsCheck.py <query>")
+    arguments = [arg for arg in sys.argv[1:] if arg != NO_LLM_CACHE_FLAG]
+    if not arguments:
+        print(f"Usage: python NewsCheck.py <query> [{NO_LLM_CACHE_FLAG}]")
         sys.exit(1)
 
-    query = sys.argv[1].strip()
+    query = arguments[0].strip()
 
     # Clear the content of sources.txt
     with open("sources.txt", "w") as file:
@@ -101,7 +131,8 @@ if __name__ == "__main__":
         results = google_search_extract(query, num_results=20)
         print("Text extraction complete. Starting text analysis...")
 
-        with ThreadPoolExecutor(max_workers=len(results)) as analysis_executor:
+        # Every page is submitted at once; the LLM client's limiter decides how many reach the server
+        with ThreadPoolExecutor(max_workers=max(1, len(results))) as analysis_executor:
             future_to_url = {
                 analysis_executor.submit(analyze_text_content, text, url): url 
                 for url, text in results.items()
@@ -127,26 +158,17 @@ if __name__ == "__main__":
         {"role": "system", "content": f"You are a helpful objective, assistant that aggregates and analyzes news articles, you also have to ignore or filter the data that has nothing to do with the following sentence, everything that it looks to be subjective to you MAY BE FAKE NEWS: {query}."}
     ]
 
+    analysis_results = fit_analyses(analysis_results)
     # ... After completing analysis for each article, add them as user messages.
-    try:
-        for url, analysis in analysis_results.items():
-            if is_relevant(analysis, query):
-                conversation.append({
-                    "role": "user",
-                    "content": f"Analysis for {url}:\n{analysis}"
-                })
-            else:
-                print(f"Excluding irrelevant analysis for {url}")
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        for url, analysis in analysis_results.items():
-            if is_relevant(analysis, query):
-                conversation.append({
-                    "role": "user",
-                    "content": f"Analysis for {url}:\n{analysis}"
-                })
-            else:
-                print(f"Excluding irrelevant analysis for {url}")
+    relevant_analyses = filter_relevant(query, analysis_results)
+    for url, analysis in analysis_results.items():
+        if url in relevant_analyses:
+            conversation.append({
+                "role": "user",
+                "content": f"Analysis for {url}:\n{analysis}"
+            })
+        else:
+            print(f"Excluding irrelevant analysis for {url}")
     # Ask the model if additional data is needed to verify the correctness of the articles.
     conversation.append({
         "role": "user",
@@ -154,19 +176,15 @@ if __name__ == "__main__":
     })
 
     try:
-        additional_data_request = client.chat.completions.create(
-            model="dolphin3.0-llama3.1-8b@q3_k_s",
-            messages=conversation, # type: ignore
-            stream=False
-        ) # type: ignore
-        additional_data_needed = additional_data_request.choices[0].message.content.strip().split('\n')
+        additional_data_needed = llm.chat(conversation).strip().split('\n')
         print(f"Additional data needed: {additional_data_needed}")
 
         # If additional data is needed, perform another round of Google searches and analyses.
         if any("yes" in data.lower() for data in additional_data_needed):
             additional_results = {}
+            additional_query_of = {}
             additional_data_needed = [data.strip('"') for data in additional_data_needed[1:] if re.match(r'^\d+\.', data) or data.startswith('-') or '"' in data]
-            with ThreadPoolExecutor(max_workers=len(additional_data_needed)) as search_executor:
+            with ThreadPoolExecutor(max_workers=max(1, min(len(additional_data_needed), 4))) as search_executor:
                 future_to_query = {
                     search_executor.submit(google_search_extract, data, num_results=5): data 
                     for data in additional_data_needed
@@ -176,10 +194,13 @@ if __name__ == "__main__":
                 try:
                     result = future.result()
                     additional_results.update(result)
+                    additional_query_of.update(dict.fromkeys(result, additional_query))
                     print(f"Successfully extracted additional data for query: {additional_query}")
                 except Exception as e:
                     print(f"Failed to extract additional data for query: {additional_query} with error: {e}")
 
+            # Different additional queries often find the same wire story
+            additional_results = drop_near_duplicates(additional_results, "additional queries")
             print("Additional text extraction complete. Starting additional text analysis...")
 
             max_workers = max(1, len(additional_results))
@@ -202,9 +223,16 @@ if __name__ == "__main__":
                     except Exception as e:
                         print(f"An error occurred analyzing {url}: {e}")
 
+            additional_analysis_results = fit_analyses(additional_analysis_results, CONTEXT_TOKENS // 4)
             # Append the additional data to the original conversation.
+            # Each analysis is checked against the additional query that found it
+            relevant_additional = set()
+            for additional_query in set(additional_query_of.values()):
+                relevant_additional.update(filter_relevant(additional_query, {
+                    url: analysis for url, analysis in additional_analysis_results.items()
+                    if additional_query_of.get(url) == additional_query}))
             for url, analysis in additional_analysis_results.items():
-                if is_relevant(analysis, additional_query):
+                if url in relevant_additional:
                     conversation.append({
                         "role": "user",
                         "content": f"Analysis for {url}:\n{analysis}"
@@ -221,39 +249,43 @@ if __name__ == "__main__":
         "content": f"Analyze your previous responses, create a 200-300 words summary and let me know if the content is reliable, fake news, or misinformation for the following title: {query}. Also, provide the main points following this format: Summary:... Overall Assessment:... Fake News Analysis:..., also provide a more accurate point of view of the story."
     })
 
-    try:
-        final_response = client.chat.completions.create(
-            model="dolphin3.0-llama3.1-8b@q3_k_s",
-            messages=conversation, # type: ignore
-            stream=False
-        ) # type: ignore
-        final_output = final_response.choices[0].message.content
-        summary_index = final_output.find("Summary:")
-        if summary_index != -1:
-            final_output = final_output[summary_index:]
-        print(final_output)
-       
-    except Exception as e:
-        print(f"An error occurred: {e}")
-
     translator = Translator()
     async def translate_query():
         translation = await translator.translate(query, dest='en')
         return translation.text
 
     translated_query = asyncio.run(translate_query())
-    # Edit the processed.txt file to erase everything before "Summary:"
+    # The summary is streamed into processed.txt, and every finished sentence is published to
+    # processed.sentences.jsonl, so TTSCaller --follow-sentences can start speaking before the model is done.
+    # A "Summary:" marker within the first sentence drops the preamble before it; without one the whole
+    # output is written, as before, once the first sentence is complete.
+    final_output = ""
     try:
-        with open("processed.txt", "r", encoding="utf-8") as file:
-            content = file.read()
-        
-        summary_index = content.find("Summary:")
-        if summary_index != -1:
-            content = content[summary_index:]
-        
-        with open("processed.txt", "w", encoding="utf-8") as file:
-            file.write(f"{translated_query} ?\n\n{final_output}")
+        with SentenceStreamWriter("processed.txt") as narration:
+            narration.write(f"{translated_query} ?\n\n")
+            start = None
+            scanned = 0
+            for delta in llm.stream_chat(conversation):
+                final_output += delta
+                if start is not None:
+                    narration.write(delta)
+                    continue
+                # Only the new text is searched, overlapping by a marker's length for markers split across deltas
+                position = max(0, scanned - len(SUMMARY_MARKER) + 1)
+                scanned = len(final_output)
+                marker = final_output.find(SUMMARY_MARKER, position)
+                if marker != -1:
+                    start = marker
+                elif SENTENCE_END.search(final_output, position) or scanned > MAX_PREAMBLE_CHARS:
+                    start = 0
+                if start is not None:
+                    narration.write(final_output[start:])
+            if start is None:
+                narration.write(final_output)
+            else:
+                final_output = final_output[start:]
+        print(final_output)
+
     except Exception as e:
-        print(f"An error occurred while editing processed.txt: {e}")
-    run_subprocess("lms unload --all")
-    run_subprocess("lms server stop")
\ No newline at end of file
+        print(f"An error occurred while writing processed.txt: {e}")
+    print(llm.summary())
\ No newline at end of file
@@ -1097,12 +1097,9 @@ class TikTokCreatorApp(QMainWindow):
         self.voice_combo = QComboBox()
         # populate voices dynamically from OpenAIFM data
         try:
-            from GeneratedScripts.OpenAITTS import find_openaifm_data_dir, load_voices_json, list_voice_names
-            data_dir = find_openaifm_data_dir()
-            voices = None
-            if data_dir:
-                voices = load_voices_json(data_dir)
-            names = list_voice_names(voices) if voices is not None else []
+            from GeneratedScripts.OpenAITTS import load_voice_catalog
+            voice_catalog = load_voice_catalog()
+            names = list(voice_catalog.voices) if voice_catalog is not None else []
             if not names:
                 names = ["en-US:Steffan(Male)", "en-US:Ana(Female)", "en-GB:Ryan(Male)"]
         except Exception:
@@ -1113,18 +1110,11 @@ class TikTokCreatorApp(QMainWindow):
         # Vibe dropdown
         self.vibe_combo = QComboBox()
         try:
-            from GeneratedScripts.OpenAITTS import find_openaifm_data_dir, load_voices_json
-            data_dir = find_openaifm_data_dir()
-            vibes = None
-            if data_dir:
-                import json
-                vfile = data_dir / 'vibes.json'
-                if vfile.exists():
-                    with open(vfile, 'r', encoding='utf-8') as vf:
-                        vibes = json.load(vf)
+            from GeneratedScripts.OpenAITTS import load_voice_catalog
+            voice_catalog = load_voice_catalog()
             vibe_names = ["---"]
-            if isinstance(vibes, dict):
-                vibe_names += list(vibes.keys())
+            if voice_catalog is not None:
+                vibe_names += voice_catalog.vibes
         except Exception:
             vibe_names = ["---"]
 
@@ -1257,8 +1247,9 @@ class TikTokCreatorApp(QMainWindow):
 
         # Locate vibes.json dynamically
         try:
-            from GeneratedScripts.OpenAITTS import find_openaifm_data_dir
-            data_dir = find_openaifm_data_dir()
+            from GeneratedScripts.OpenAITTS import load_voice_catalog
+            voice_catalog = load_voice_catalog()
+            data_dir = voice_catalog.data_dir if voice_catalog is not None else None
             if not data_dir:
                 QMessageBox.warning(self, "Vibe Error", "Could not locate OpenAIFM data directory")
                 return
@@ -2715,7 +2706,8 @@ class TikTokCreatorApp(QMainWindow):
             for file in os.listdir(scripts_dir):
                 excluded_files = ["tiktokimagegenForGenerated.py", "editVideoTestForGenerated.py", 
                                   "parsetextForGenerated.py", 
-                                 "postForGenerated.py", "SeleniumRecorder.py", "TTSCaller.py", "OpenAITTS.py"]
+                                 "postForGenerated.py", "SeleniumRecorder.py", "TTSCaller.py", "OpenAITTS.py",
+                                 "pipelineForGenerated.py"]
                 if file.endswith(".py") and not file.startswith("__") and file not in excluded_files:
                     workflow_scripts.append(file)
             
@@ -0,0 +1,173 @@
+"""
+Sentence audio handoff between TTSCaller and the video editor.
+TTSCaller appends each synthesized sentence to a single float32 sample file and
+records its offset in an index; the editor memory-maps the file and assembles
+the narration in sentence order, without scanning a directory for WAV files.
+Only the files of a stream are ever deleted: a non-empty directory that does
+not hold a stream is refused rather than cleared.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DATA_NAME = "audio.f32"
+INDEX_NAME = "index.json"
+STREAM_FILES = (DATA_NAME, INDEX_NAME, INDEX_NAME + ".tmp")
+
+
+def is_stream(directory: str) -> bool:
+    """Return True if directory holds an audio stream."""
+    return os.path.isfile(os.path.join(directory, INDEX_NAME))
+
+
+def remove_stream(directory: str, extra_files: Iterable[str] = ()) -> None:
+    """
+    Delete the files of a stream, and the directory once it is empty.
+
+    Args:
+        directory: Stream directory
+        extra_files: Other file names written into the stream directory (e.g. the sentence manifest)
+    """
+    for name in (*STREAM_FILES, *extra_files):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            os.remove(path)
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass
+
+
+class AudioStreamWriter:
+    """Append sentence audio to a stream directory as it is synthesized."""
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: New or empty directory, or the directory of an earlier stream
+
+        Raises:
+            FileExistsError: If directory holds other files and no stream
+        """
+        if os.path.isdir(directory) and os.listdir(directory):
+            if not is_stream(directory):
+                raise FileExistsError(f"{directory} is not empty and holds no audio stream; refusing to overwrite it")
+            remove_stream(directory)
+        self.directory = directory
+        self.sample_rate: Optional[int] = None
+        self.channels: Optional[int] = None
+        self.segments: List[dict] = []
+        self.frames = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.data_file = open(os.path.join(directory, DATA_NAME), "wb")
+        self._write_index(complete=False)
+
+    def write(self, index: int, data: np.ndarray, sample_rate: int) -> None:
+        """
+        Append the audio of one sentence.
+
+        Sentences may arrive in any order; the index keeps their position.
+
+        Args:
+            index: Sentence index
+            data: Samples of shape (samples, channels) or (samples,)
+            sample_rate: Sample rate in Hz
+        """
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim == 1:
+            data = data[:, None]
+        with self.lock:
+            if self.sample_rate is None:
+                self.sample_rate, self.channels = int(sample_rate), data.shape[1]
+            elif int(sample_rate) != self.sample_rate:
+                raise ValueError(f"Sentence {index} has sample rate {sample_rate}, stream uses {self.sample_rate}")
+            if data.shape[1] != self.channels:
+                data = np.repeat(data.mean(axis=1, keepdims=True), self.channels, axis=1)
+            self.data_file.write(np.ascontiguousarray(data).tobytes())
+            self.data_file.flush()
+            self.segments.append({"index": index, "offset": self.frames, "frames": data.shape[0]})
+            self.frames += data.shape[0]
+            self._write_index(complete=False)
+
+    def close(self) -> None:
+        """Mark the stream complete so readers stop waiting."""
+        with self.lock:
+            self.data_file.close()
+            self._write_index(complete=True)
+
+    def _write_index(self, complete: bool) -> None:
+        index_path = os.path.join(self.directory, INDEX_NAME)
+        temp_path = index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "sample_rate": self.sample_rate,
+                "channels": self.channels,
+                "complete": complete,
+                "segments": sorted(self.segments, key=lambda s: s["index"]),
+            }, f, indent=2)
+        os.replace(temp_path, index_path)
+
+
+class AudioStreamReader:
+    """Read the sentence audio of a stream directory in sentence order."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index = self._read_index()
+
+    def _read_index(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, INDEX_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"complete": False, "segments": []}
+
+    def wait(self, timeout: Optional[float] = None, poll: float = 0.2) -> bool:
+        """
+        Wait until the writer has closed the stream.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+            poll: Seconds between index checks
+
+        Returns:
+            True if the stream is complete
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.index.get("complete"):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+            self.index = self._read_index()
+        return True
+
+    @property
+    def sample_rate(self) -> Optional[int]:
+        return self.index.get("sample_rate")
+
+    def segments(self) -> Iterator[Tuple[int, np.ndarray, int]]:
+        """Yield (index, samples, sample_rate) per sentence; samples are memory-mapped views."""
+        if not self.index["segments"]:
+            return
+        samples = np.memmap(os.path.join(self.directory, DATA_NAME), dtype=np.float32, mode="r")
+        samples = samples.reshape(-1, self.index["channels"])
+        for segment in self.index["segments"]:
+            start = segment["offset"]
+            yield segment["index"], samples[start:start + segment["frames"]], self.sample_rate
+
+    def durations(self) -> List[Tuple[int, float]]:
+        """Return (index, seconds) per sentence, in sentence order."""
+        return [(segment["index"], segment["frames"] / float(self.sample_rate)) for segment in self.index["segments"]]
+
+    def combined(self) -> np.ndarray:
+        """Concatenate every sentence in order into one (samples, channels) array."""
+        parts = [samples for _, samples, _ in self.segments()]
+        if not parts:
+            return np.zeros((0, self.index.get("channels") or 1), dtype=np.float32)
+        return np.concatenate(parts)
@@ -0,0 +1,298 @@
+"""
+NumPy audio helpers for the TTS stage.
+Converts ComfyUI audio to arrays, writes WAV files, finds silences used to
+split batched synthesis results back into sentences, and post-processes
+sentence clips (silence trimming and EBU R128-style loudness matching).
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Frames quieter than this (relative to the loudest frame) count as silence
+SILENCE_DB = -35.0
+
+# Loudness every sentence is brought to, in LUFS
+TARGET_LUFS = -16.0
+
+# ITU-R BS.1770 gating: 400 ms blocks every 100 ms, absolute gate and relative gate
+LOUDNESS_BLOCK_S = 0.4
+LOUDNESS_HOP_S = 0.1
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+# Gain is reduced when it would push a clip's peak above this level
+PEAK_CEILING = 0.98
+
+
+def waveform_to_array(waveform) -> np.ndarray:
+    """
+    Convert a ComfyUI waveform ([batch, channels, samples] tensor) to a (samples, channels) array.
+
+    Args:
+        waveform: Torch tensor or array
+
+    Returns:
+        float32 array of shape (samples, channels)
+    """
+    if hasattr(waveform, "detach"):
+        waveform = waveform.detach().cpu().numpy()
+    data = np.asarray(waveform, dtype=np.float32)
+    while data.ndim > 2:
+        data = data[0]
+    if data.ndim == 1:
+        return data[:, None]
+    return data.T
+
+
+def write_wav(path, data: np.ndarray, sample_rate: int) -> float:
+    """
+    Write a (samples, channels) array as 16-bit PCM WAV.
+
+    Args:
+        path: Output path
+        data: Audio samples
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Duration of the written audio in seconds
+    """
+    import soundfile as sf
+    sf.write(str(path), data, int(sample_rate), subtype="PCM_16")
+    return data.shape[0] / float(sample_rate)
+
+
+def to_mono(data: np.ndarray) -> np.ndarray:
+    """Average the channels of a (samples, channels) array."""
+    return data if data.ndim == 1 else data.mean(axis=1)
+
+
+def frame_rms(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    Compute the RMS level of consecutive non-overlapping frames.
+
+    Args:
+        samples: Mono samples
+        frame_length: Samples per frame
+
+    Returns:
+        RMS value per frame (the last partial frame is zero-padded)
+    """
+    frame_count = max(1, -(-len(samples) // frame_length))
+    padded = np.zeros(frame_count * frame_length, dtype=np.float64)
+    padded[:len(samples)] = samples
+    frames = padded.reshape(frame_count, frame_length)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def silent_runs(samples: np.ndarray, sample_rate: int, frame_ms: float = 10.0,
+                silence_db: float = SILENCE_DB) -> List[Tuple[int, int]]:
+    """
+    Find runs of silent frames.
+
+    Args:
+        samples: Mono samples
+        sample_rate: Sample rate in Hz
+        frame_ms: Analysis frame length in milliseconds
+        silence_db: Silence threshold relative to the loudest frame
+
+    Returns:
+        List of (start_sample, end_sample) silent runs
+    """
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    rms = frame_rms(samples, frame_length)
+    threshold = rms.max() * 10 ** (silence_db / 20)
+    silent = np.concatenate(([False], rms <= threshold, [False]))
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    return [(int(s) * frame_length, min(len(samples), int(e) * frame_length)) for s, e in zip(starts, ends)]
+
+
+def split_at_silences(samples: np.ndarray, sample_rate: int, weights: Sequence[float],
+                      frame_ms: float = 10.0) -> List[Tuple[int, int]]:
+    """
+    Split audio containing several sentences back into one segment per sentence.
+
+    The expected boundary between sentences is placed proportionally to their
+    weights (e.g. character counts); each boundary then snaps to the centre of
+    the silence between the previous cut and the next expected boundary that
+    best combines closeness and length. Boundaries without such a silence stay
+    at the expected position.
+
+    Args:
+        samples: Mono samples of the whole batch
+        sample_rate: Sample rate in Hz
+        weights: Relative length of each sentence
+        frame_ms: Analysis frame length in milliseconds
+
+    Returns:
+        List of (start_sample, end_sample), one per weight
+    """
+    total = len(samples)
+    if len(weights) <= 1:
+        return [(0, total)]
+    cumulative = np.cumsum(np.asarray(weights, dtype=np.float64))
+    expected = (cumulative[:-1] / cumulative[-1] * total).astype(np.int64)
+    runs = silent_runs(samples, sample_rate, frame_ms)
+    # Leading and trailing silence cannot separate two sentences
+    runs = [(s, e) for s, e in runs if s > 0 and e < total]
+    centres = np.array([(s + e) // 2 for s, e in runs], dtype=np.int64)
+    lengths = np.array([e - s for s, e in runs], dtype=np.int64)
+
+    cuts = []
+    previous = 0
+    for k, position in enumerate(expected):
+        # Never reach past the next expected boundary, so each gap keeps its own silence
+        upper = expected[k + 1] if k + 1 < len(expected) else total
+        candidates = np.flatnonzero((centres > previous) & (centres < upper))
+        if candidates.size:
+            score = np.abs(centres[candidates] - position) - 0.5 * lengths[candidates]
+            cut = int(centres[candidates[np.argmin(score)]])
+        else:
+            cut = int(max(position, previous + 1))
+        cut = min(cut, total - 1)
+        cuts.append(cut)
+        previous = cut
+    bounds = [0] + cuts + [total]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(weights))]
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int, frame_ms: float = 10.0,
+                 silence_db: float = SILENCE_DB, pad_ms: float = 80.0) -> Tuple[int, int]:
+    """
+    Find the span of a clip between its leading and trailing silence.
+
+    Args:
+        samples: Mono samples
+        sample_rate: Sample rate in Hz
+        frame_ms: Analysis frame length in milliseconds
+        silence_db: Silence threshold relative to the loudest frame
+        pad_ms: Silence kept on each side so words are not clipped and sentences keep a pause
+
+    Returns:
+        Tuple of (start_sample, end_sample)
+    """
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    rms = frame_rms(samples, frame_length)
+    loud = np.flatnonzero(rms > rms.max() * 10 ** (silence_db / 20))
+    if loud.size == 0:
+        return 0, len(samples)
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, int(loud[0]) * frame_length - pad)
+    end = min(len(samples), (int(loud[-1]) + 1) * frame_length + pad)
+    return start, end
+
+
+def _biquad_high_shelf(sample_rate: int, gain_db: float = 4.0, freq: float = 1500.0, q: float = 0.7071):
+    a = 10 ** (gain_db / 40)
+    w0 = 2 * np.pi * freq / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    b = [a * ((a + 1) + (a - 1) * cos_w0 + 2 * np.sqrt(a) * alpha),
+         -2 * a * ((a - 1) + (a + 1) * cos_w0),
+         a * ((a + 1) + (a - 1) * cos_w0 - 2 * np.sqrt(a) * alpha)]
+    den = [(a + 1) - (a - 1) * cos_w0 + 2 * np.sqrt(a) * alpha,
+           2 * ((a - 1) - (a + 1) * cos_w0),
+           (a + 1) - (a - 1) * cos_w0 - 2 * np.sqrt(a) * alpha]
+    return np.array(b) / den[0], np.array(den) / den[0]
+
+
+def _biquad_high_pass(sample_rate: int, freq: float = 38.0, q: float = 0.5):
+    w0 = 2 * np.pi * freq / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    b = np.array([1.0, -2.0, 1.0]) * (1 + cos_w0) / 2
+    den = np.array([1 + alpha, -2 * cos_w0, 1 - alpha])
+    return b / den[0], den / den[0]
+
+
+def k_weight(data: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Apply the BS.1770 K-weighting filter (high shelf, then high pass) along the sample axis.
+
+    Args:
+        data: Samples of shape (samples, channels)
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Filtered samples with the same shape
+    """
+    from scipy.signal import lfilter
+    for b, a in (_biquad_high_shelf(sample_rate), _biquad_high_pass(sample_rate)):
+        data = lfilter(b, a, data, axis=0)
+    return data
+
+
+def clip_loudness(data: np.ndarray, sample_rate: int, lengths: Sequence[int]) -> np.ndarray:
+    """
+    Measure the gated integrated loudness of several clips laid end to end.
+
+    The whole buffer is K-weighted once; block energies of every clip come from
+    one cumulative sum, and both gates are applied per clip with bincount.
+    Clips shorter than a block are measured as a single block.
+
+    Args:
+        data: Concatenated clips, shape (samples, channels)
+        sample_rate: Sample rate in Hz
+        lengths: Length of each clip in samples, in buffer order
+
+    Returns:
+        Loudness of each clip in LUFS (-inf for silent clips)
+    """
+    power = (k_weight(data.astype(np.float64), sample_rate) ** 2).sum(axis=1)
+    cumulative = np.concatenate(([0.0], np.cumsum(power)))
+    block = int(sample_rate * LOUDNESS_BLOCK_S)
+    hop = int(sample_rate * LOUDNESS_HOP_S)
+
+    starts, ends, owners = [], [], []
+    offset = 0
+    for clip, length in enumerate(lengths):
+        if length >= block:
+            clip_starts = offset + np.arange(0, length - block + 1, hop)
+            starts.append(clip_starts)
+            ends.append(clip_starts + block)
+        else:
+            starts.append(np.array([offset]))
+            ends.append(np.array([offset + max(1, length)]))
+        owners.append(np.full(len(starts[-1]), clip))
+        offset += length
+    starts, ends, owners = np.concatenate(starts), np.concatenate(ends), np.concatenate(owners)
+    energy = (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+    count = len(lengths)
+    gated = energy > 10 ** ((ABSOLUTE_GATE_LUFS + 0.691) / 10)
+    kept = np.bincount(owners, weights=gated, minlength=count)
+    mean = np.bincount(owners, weights=energy * gated, minlength=count) / np.maximum(kept, 1)
+    relative = mean[owners] * 10 ** (RELATIVE_GATE_LU / 10)
+    gated &= energy > relative
+    kept = np.bincount(owners, weights=gated, minlength=count)
+    mean = np.bincount(owners, weights=energy * gated, minlength=count) / np.maximum(kept, 1)
+    with np.errstate(divide="ignore"):
+        return np.where(kept > 0, -0.691 + 10 * np.log10(mean), -np.inf)
+
+
+def postprocess_clips(clips: Sequence[np.ndarray], sample_rate: int, target_lufs: float = TARGET_LUFS,
+                      trim: bool = True) -> List[np.ndarray]:
+    """
+    Trim leading/trailing silence from sentence clips and match their loudness.
+
+    Args:
+        clips: Clips of shape (samples, channels), all at sample_rate with the same channel count
+        sample_rate: Sample rate in Hz
+        target_lufs: Loudness every clip is brought to
+        trim: Trim silence before measuring
+
+    Returns:
+        Processed clips, in the same order
+    """
+    if not clips:
+        return []
+    if trim:
+        clips = [clip[slice(*trim_silence(to_mono(clip), sample_rate))] for clip in clips]
+    lengths = [len(clip) for clip in clips]
+    loudness = clip_loudness(np.concatenate(clips), sample_rate, lengths)
+    gains = np.where(np.isfinite(loudness), 10 ** ((target_lufs - loudness) / 20), 1.0)
+    peaks = np.array([np.abs(clip).max() if len(clip) else 0.0 for clip in clips])
+    # Never amplify a clip into clipping
+    gains = np.minimum(gains, np.where(peaks > 0, PEAK_CEILING / np.maximum(peaks, 1e-9), gains))
+    return [(clip * gain).astype(np.float32) for clip, gain in zip(clips, gains)]
@@ -0,0 +1,104 @@
+"""
+Zoom clip rendering helpers shared by the video editor and the pipelined runner.
+"""
+
+import re
+
+from frame_handoff import ffmpeg_input_args
+from helper import run_subprocess
+
+# Frame rate used for every zoom clip in the final video
+CLIP_FPS = 60
+
+# Average narration speed used to estimate clip lengths before the audio exists
+WORDS_PER_SECOND = 2.5
+
+
+def clip_resolution(add_minigame: bool) -> str:
+    """
+    Get the zoom clip resolution for the current layout.
+
+    Args:
+        add_minigame: Whether the video is stacked on top of a minigame recording
+
+    Returns:
+        Resolution string in "widthxheight" format
+    """
+    return "1280x960" if add_minigame else "1280x1920"
+
+
+def estimate_speech_duration(text: str, words_per_second: float = WORDS_PER_SECOND) -> float:
+    """
+    Estimate how long a narration of the given text will take.
+
+    Args:
+        text: Text that will be synthesized
+        words_per_second: Expected speaking rate
+
+    Returns:
+        Estimated duration in seconds
+    """
+    words = re.findall(r"\w+", text)
+    return len(words) / words_per_second
+
+
+def create_zoom_video(image_file, output_video, duration=10, fps=30, zoom_limit=1.5, resolution="1280x720"):
+    """
+    Create a zoom effect video from a single image using FFmpeg's zoompan filter.
+
+    Parameters:
+        image_file (str): Path to the input image or raw handoff frame.
+        output_video (str): Path for the output video.
+        duration (int|float): Desired duration of the video in seconds.
+        fps (int): Frame rate of the output video.
+        zoom_limit (float): Maximum zoom factor.
+        resolution (str): Output resolution as "widthxheight" (e.g., "1280x720").
+    """
+
+    # The number of frames determines how long each zoom step lasts.
+    # 'd' in zoompan is set to the number of frames per zoom step.
+    total_frames = int(duration * fps)
+    # Experiment with the zoom speed. Here, the expression increases zoom until it reaches zoom_limit.
+    zoom_expr = f"min(zoom+0.0015,{zoom_limit})"
+    # Build the zoompan filter. Force the original aspect ratio to decrease if needed.
+    vf_filter = f"zoompan=z='{zoom_expr}':x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':d={total_frames}:s={resolution},fps={fps}"
+
+    cmd = [
+        "ffmpeg", "-y",
+        *ffmpeg_input_args(image_file),  # Loop the image infinitely, or read a raw frame once.
+        "-vf", vf_filter,
+        "-c:v", "libx264",
+        "-t", str(duration),         # Set the video duration.
+        "-pix_fmt", "yuv420p",       # Ensure broad playback compatibility.
+        output_video
+    ]
+
+    run_subprocess(cmd, check=True)
+
+
+def trim_clip(input_video, output_video, duration, fps=CLIP_FPS):
+    """
+    Cut a clip to an exact number of frames.
+
+    Stream copy can only cut on packet boundaries, which leaves stray frames at
+    the end of clips with B-frames, so the kept frames are re-encoded.
+
+    Parameters:
+        input_video (str): Clip rendered longer than needed.
+        output_video (str): Path for the trimmed clip.
+        duration (float): Duration to keep in seconds.
+        fps (int): Frame rate of the clip.
+    """
+    cmd = [
+        "ffmpeg", "-y",
+        "-i", input_video,
+        "-frames:v", str(max(1, round(duration * fps))),
+        "-an",
+        "-c:v", "libx264",
+        "-pix_fmt", "yuv420p",
+        output_video
+    ]
+    run_subprocess(cmd, check=True)
+
+# Example usage:
+# create_zoom_video("image.jpg", "output_zoom.mp4", duration=10, fps=30, zoom_limit=1.5, resolution="1280x720")
@@ -0,0 +1,389 @@
+"""
+Local stand-in servers for development and load testing without network access.
+
+    python dev_servers.py openaifm --port 8765 --latency 0.4 --jitter 0.2 --failure-rate 0.05
+    python dev_servers.py files --root ./fixtures --port 8766 --drop-after 65536
+    python dev_servers.py llm --port 1234 --slots 1 --tokens-per-second 40
+
+The openaifm server mimics the OpenAIFM generate endpoint: it accepts the same
+form fields, waits for the configured latency, fails a configurable fraction of
+requests with HTTP 503 and otherwise answers with WAV audio from the
+deterministic local synthesizer.
+
+The files server serves a directory with ETag, If-None-Match, Range and
+If-Range support, and can cut full responses short to exercise resumed
+downloads.
+
+The llm server answers OpenAI-style /v1/chat/completions and /v1/models (and
+LM Studio's /api/v0/models with every model reported as loaded, and /props
+with llama.cpp's total_slots unless --hide-slots is given). It
+decodes at most --slots requests at once at a fixed token rate; further
+requests queue inside the server like they do in LM Studio. Replies echo the
+start of the last message, so runs are deterministic; with "stream": true they
+are sent as server-sent events, one word per token, followed by the usage
+when stream_options asks for it.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from tts_backends import LocalSineBackend
+
+
+class OpenAIFMHandler(BaseHTTPRequestHandler):
+    """Request handler of the mock OpenAIFM endpoint; settings live on the server."""
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        import soundfile as sf
+        if self.path.split("?")[0] != "/api/generate":
+            self._send(404, b"not found", "text/plain")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        server = self.server
+        time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+        with server.stats_lock:
+            server.requests += 1
+            fail = server.random.random() < server.failure_rate
+            if fail:
+                server.failures += 1
+        if fail:
+            self._send(503, b"simulated failure", "text/plain")
+            return
+        text = form.get("input", "")
+        if not text.strip():
+            self._send(400, b"missing input", "text/plain")
+            return
+        samples = server.synthesizer.synthesize(text, form.get("voice", "alloy"))
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, server.synthesizer.sample_rate, format="WAV", subtype="PCM_16")
+        self._send(200, buffer.getvalue(), "audio/wav")
+
+
+def make_openaifm_server(host: str = "127.0.0.1", port: int = 8765, latency: float = 0.0,
+                         jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0,
+                         verbose: bool = False) -> ThreadingHTTPServer:
+    """
+    Create the mock OpenAIFM server (call serve_forever() to run it).
+
+    Args:
+        host: Address to bind
+        port: Port to bind (0 picks a free port)
+        latency: Mean seconds before each response
+        jitter: Latency varies uniformly by +/- this many seconds
+        failure_rate: Fraction of requests answered with HTTP 503
+        seed: Seed of the failure sequence
+        verbose: Log every request
+
+    Returns:
+        The server instance
+    """
+    server = ThreadingHTTPServer((host, port), OpenAIFMHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.failure_rate = failure_rate
+    server.random = random.Random(seed)
+    server.synthesizer = LocalSineBackend()
+    server.verbose = verbose
+    server.stats_lock = threading.Lock()
+    server.requests = 0
+    server.failures = 0
+    return server
+
+
+class StaticFileHandler(BaseHTTPRequestHandler):
+    """Serve files from server.root with validators and byte ranges."""
+
+    RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _resolve(self):
+        relative = self.path.split("?")[0].lstrip("/")
+        path = os.path.realpath(os.path.join(self.server.root, relative))
+        if not path.startswith(self.server.root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def _serve(self, send_body: bool):
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = f'"{size:x}-{int(stat.st_mtime_ns):x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start, end = 0, size - 1
+        status = 200
+        match = self.RANGE_RE.match(self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and (if_range is None or if_range == etag):
+            first, last = match.groups()
+            if first:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            elif last:
+                start = max(0, size - int(last))
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        length = end - start + 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body:
+            return
+        # Full responses may be cut short to simulate a dropped connection
+        limit = self.server.drop_after if status == 200 and self.server.drop_after else length
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = min(length, limit)
+            while remaining > 0:
+                chunk = f.read(min(64 * 1024, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+        if limit < length:
+            self.close_connection = True
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+
+def make_file_server(root: str, host: str = "127.0.0.1", port: int = 8766, drop_after: int = 0,
+                     verbose: bool = False) -> ThreadingHTTPServer:
+    """
+    Create the static file server (call serve_forever() to run it).
+
+    Args:
+        root: Directory to serve
+        host: Address to bind
+        port: Port to bind (0 picks a free port)
+        drop_after: Close full (non-range) responses after this many bytes (0 = never)
+        verbose: Log every request
+
+    Returns:
+        The server instance
+    """
+    server = ThreadingHTTPServer((host, port), StaticFileHandler)
+    server.daemon_threads = True
+    server.root = os.path.realpath(root)
+    server.drop_after = drop_after
+    server.verbose = verbose
+    return server
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat completions with a fixed number of decoding slots."""
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": model, "object": "model"} for model in self.server.models]})
+        elif path == "/api/v0/models":
+            # LM Studio's REST API also reports whether each model is loaded
+            self._send_json(200, {"object": "list", "data": [{"id": model, "object": "model", "state": "loaded"}
+                                                             for model in self.server.models]})
+        elif path == "/props" and not self.server.hide_slots:
+            self._send_json(200, {"total_slots": self.server.slot_count})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/v1/chat/completions":
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        messages = request.get("messages") or []
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+        last = str(messages[-1].get("content", "")) if messages else ""
+        words = last.split()[:int(request.get("max_tokens") or self.server.reply_tokens)]
+        server = self.server
+        with server.stats_lock:
+            server.requests += 1
+        if request.get("stream"):
+            self._stream(request, prompt_tokens, words)
+            return
+        with server.slots:
+            time.sleep(prompt_tokens / server.prefill_rate + len(words) / server.tokens_per_second)
+        self._send_json(200, {
+            "id": f"chatcmpl-{server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", ""),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": " ".join(words)}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                      "total_tokens": prompt_tokens + len(words)},
+        })
+
+
+    def _stream(self, request: dict, prompt_tokens: int, words: list) -> None:
+        """Send the reply as server-sent events, one word per token."""
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.close_connection = True
+        with server.slots:
+            time.sleep(prompt_tokens / server.prefill_rate)
+            for position, word in enumerate(words):
+                time.sleep(1.0 / server.tokens_per_second)
+                chunk = {"id": f"chatcmpl-{server.requests}", "object": "chat.completion.chunk",
+                         "created": int(time.time()), "model": request.get("model", ""),
+                         "choices": [{"index": 0, "finish_reason": None,
+                                      "delta": {"content": word if position == 0 else " " + word}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        if (request.get("stream_options") or {}).get("include_usage"):
+            chunk = {"id": f"chatcmpl-{server.requests}", "object": "chat.completion.chunk",
+                     "created": int(time.time()), "model": request.get("model", ""), "choices": [],
+                     "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                               "total_tokens": prompt_tokens + len(words)}}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def make_llm_server(host: str = "127.0.0.1", port: int = 1234, slots: int = 1, tokens_per_second: float = 40.0,
+                    prefill_rate: float = 2000.0, reply_tokens: int = 64, models=("dolphin3.0-llama3.1-8b@q3_k_s",),
+                    hide_slots: bool = False, verbose: bool = False) -> ThreadingHTTPServer:
+    """
+    Create the mock LLM server (call serve_forever() to run it).
+
+    Args:
+        host: Address to bind
+        port: Port to bind (0 picks a free port)
+        slots: Requests decoded at once; the rest wait
+        tokens_per_second: Decoding speed of one request
+        prefill_rate: Prompt tokens processed per second
+        reply_tokens: Reply length when the request sets no max_tokens
+        models: Model identifiers listed by /v1/models
+        hide_slots: Answer /props with 404, like servers that do not report their slots
+        verbose: Log every request
+
+    Returns:
+        The server instance
+    """
+    server = ThreadingHTTPServer((host, port), MockLLMHandler)
+    server.daemon_threads = True
+    server.slots = threading.BoundedSemaphore(max(1, slots))
+    server.slot_count = max(1, slots)
+    server.hide_slots = hide_slots
+    server.tokens_per_second = tokens_per_second
+    server.prefill_rate = prefill_rate
+    server.reply_tokens = reply_tokens
+    server.models = list(models)
+    server.verbose = verbose
+    server.stats_lock = threading.Lock()
+    server.requests = 0
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local stand-in servers for development and load testing")
+    commands = parser.add_subparsers(dest="command", required=True)
+    openaifm = commands.add_parser("openaifm", help="Mock OpenAIFM TTS endpoint (POST /api/generate)")
+    openaifm.add_argument("--host", default="127.0.0.1")
+    openaifm.add_argument("--port", type=int, default=8765)
+    openaifm.add_argument("--latency", type=float, default=0.0, help="Mean response latency in seconds")
+    openaifm.add_argument("--jitter", type=float, default=0.0, help="Uniform latency variation in seconds")
+    openaifm.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests that fail with 503")
+    openaifm.add_argument("--seed", type=int, default=0)
+    openaifm.add_argument("--verbose", action="store_true", help="Log every request")
+    files = commands.add_parser("files", help="Static files with ETag and Range support")
+    files.add_argument("--root", default=".", help="Directory to serve")
+    files.add_argument("--host", default="127.0.0.1")
+    files.add_argument("--port", type=int, default=8766)
+    files.add_argument("--drop-after", type=int, default=0, help="Cut full responses after this many bytes")
+    files.add_argument("--verbose", action="store_true", help="Log every request")
+    llm = commands.add_parser("llm", help="Mock OpenAI-compatible LLM server (/v1/chat/completions)")
+    llm.add_argument("--host", default="127.0.0.1")
+    llm.add_argument("--port", type=int, default=1234)
+    llm.add_argument("--slots", type=int, default=1, help="Requests decoded at once")
+    llm.add_argument("--tokens-per-second", type=float, default=40.0, help="Decoding speed per request")
+    llm.add_argument("--reply-tokens", type=int, default=64, help="Reply length without max_tokens")
+    llm.add_argument("--hide-slots", action="store_true", help="Do not report the slots on /props")
+    llm.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    if args.command == "openaifm":
+        server = make_openaifm_server(args.host, args.port, args.latency, args.jitter,
+                                      args.failure_rate, args.seed, args.verbose)
+        print(f"Mock OpenAIFM listening on http://{args.host}:{server.server_port}/api/generate")
+    elif args.command == "llm":
+        server = make_llm_server(args.host, args.port, args.slots, args.tokens_per_second,
+                                 reply_tokens=args.reply_tokens, hide_slots=args.hide_slots, verbose=args.verbose)
+        print(f"Mock LLM listening on http://{args.host}:{server.server_port}/v1")
+    else:
+        server = make_file_server(args.root, args.host, args.port, args.drop_after, args.verbose)
+        print(f"Serving {server.root} on http://{args.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.command == "openaifm":
+            print(f"Served {server.requests} requests, {server.failures} simulated failures")
+        elif args.command == "llm":
+            print(f"Served {server.requests} requests")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
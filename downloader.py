@@ -0,0 +1,211 @@
+"""
+Concurrent, resumable HTTP downloader.
+Files are streamed in chunks to a .part file over a pooled requests session.
+An interrupted .part file resumes with an HTTP Range request. Files already
+present are skipped when the server's ETag (or, without one, the size) still
+matches. ETags are kept in a small JSON index next to the downloads.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+META_NAME = ".downloads.json"
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    path: Optional[Path]
+    status: str  # "downloaded", "resumed", "skipped" or "failed"
+    bytes: int = 0
+    error: str = ""
+
+
+@dataclass
+class DownloadSummary:
+    results: List[DownloadResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def count(self, status: str) -> int:
+        return sum(1 for result in self.results if result.status == status)
+
+    def __str__(self) -> str:
+        transferred = sum(result.bytes for result in self.results) / (1024 * 1024)
+        rate = transferred / self.seconds if self.seconds else 0.0
+        return (f"{self.count('downloaded')} downloaded, {self.count('resumed')} resumed, "
+                f"{self.count('skipped')} skipped, {self.count('failed')} failed; "
+                f"{transferred:.1f} MB in {self.seconds:.1f}s ({rate:.1f} MB/s)")
+
+
+def filename_for(url: str) -> str:
+    """Choose the local file name of a URL."""
+    return url.split("/")[-1].split("?")[0] or "file.bin"
+
+
+def make_session(pool_size: int = 8) -> requests.Session:
+    """Create a session whose connection pool holds pool_size connections per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class Downloader:
+    """Download URLs into one directory, resuming and skipping where possible."""
+
+    def __init__(self, dest_dir: Union[str, Path], workers: int = 4, retries: int = 2,
+                 timeout: float = 30.0, chunk_size: int = CHUNK_SIZE):
+        self.dest_dir = Path(dest_dir)
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.session = make_session(self.workers)
+        self.lock = threading.Lock()
+        self.meta_path = self.dest_dir / META_NAME
+        try:
+            with self.meta_path.open("r", encoding="utf-8") as f:
+                self.meta: Dict[str, dict] = json.load(f)
+        except (OSError, ValueError):
+            self.meta = {}
+
+    def _save_meta(self) -> None:
+        with self.lock:
+            temp_path = self.meta_path.with_suffix(".tmp")
+            with temp_path.open("w", encoding="utf-8") as f:
+                json.dump(self.meta, f, indent=2)
+            os.replace(temp_path, self.meta_path)
+
+    def _is_current(self, url: str, dest: Path) -> bool:
+        """Return True if dest already holds the server's current version of url."""
+        if not dest.exists():
+            return False
+        with self.lock:
+            known = self.meta.get(url, {})
+        headers = {"If-None-Match": known["etag"]} if known.get("etag") else {}
+        response = self.session.head(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+        if response.status_code == 304:
+            return True
+        if not response.ok:
+            return False
+        etag = response.headers.get("ETag")
+        if etag and known.get("etag"):
+            return etag == known["etag"] and dest.stat().st_size == known.get("size")
+        length = response.headers.get("Content-Length")
+        return length is not None and int(length) == dest.stat().st_size
+
+    @staticmethod
+    def _complete_part(response: requests.Response, offset: int, known: dict) -> bool:
+        """Return True if a 416 answer means the part file already holds the whole, unchanged file."""
+        # An unsatisfiable range is answered with "Content-Range: bytes */<total size>"
+        content_range = response.headers.get("Content-Range", "")
+        try:
+            total = int(content_range.rsplit("/", 1)[1])
+        except (IndexError, ValueError):
+            return False
+        etag = response.headers.get("ETag")
+        return total == offset and not (etag and known.get("etag") and etag != known["etag"])
+
+    def _fetch(self, url: str, dest: Path) -> DownloadResult:
+        part = dest.with_name(dest.name + ".part")
+        offset = part.stat().st_size if part.exists() else 0
+        with self.lock:
+            known = self.meta.get(url, {})
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if known.get("etag"):
+                # Resume only if the file has not changed since the partial download
+                headers["If-Range"] = known["etag"]
+        restart = False
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            written = 0
+            if response.status_code == 416 and offset:
+                # Either the part file already holds every byte, or the remote file shrank or changed
+                resumed = True
+                restart = not self._complete_part(response, offset, known)
+            else:
+                response.raise_for_status()
+                resumed = response.status_code == 206
+                expected = response.headers.get("Content-Length")
+                with self.lock:
+                    # Recorded before streaming so an interrupted transfer can resume with If-Range
+                    self.meta[url] = {"file": dest.name, "etag": response.headers.get("ETag") or known.get("etag")}
+                with part.open("ab" if resumed else "wb") as out:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        out.write(chunk)
+                        written += len(chunk)
+                if expected is not None and written != int(expected):
+                    raise IOError(f"Incomplete transfer: {written} of {expected} bytes")
+        if restart:
+            part.unlink()
+            return self._fetch(url, dest)
+        os.replace(part, dest)
+        with self.lock:
+            self.meta.setdefault(url, {"file": dest.name, "etag": known.get("etag")})["size"] = dest.stat().st_size
+        return DownloadResult(url, dest, "resumed" if resumed else "downloaded", written)
+
+    def download(self, url: str) -> DownloadResult:
+        """
+        Download one URL, skipping it when the local copy is current.
+
+        Args:
+            url: URL to fetch
+
+        Returns:
+            DownloadResult describing what happened
+        """
+        dest = self.dest_dir / filename_for(url)
+        error = ""
+        for attempt in range(self.retries + 1):
+            try:
+                if self._is_current(url, dest):
+                    return DownloadResult(url, dest, "skipped")
+                return self._fetch(url, dest)
+            except (requests.RequestException, IOError) as e:
+                # Whatever reached the .part file is kept and resumed on the next attempt
+                error = str(e)
+                response = getattr(e, "response", None)
+                if response is not None and 400 <= response.status_code < 500:
+                    break
+                if attempt < self.retries:
+                    time.sleep(0.5 * (2 ** attempt))
+        return DownloadResult(url, None, "failed", error=error)
+
+    def download_all(self, urls: List[str], progress=print) -> DownloadSummary:
+        """
+        Download URLs concurrently.
+
+        Args:
+            urls: URLs to fetch (duplicates are fetched once)
+            progress: Called with one line per finished URL (None to stay quiet)
+
+        Returns:
+            DownloadSummary of every URL
+        """
+        self.dest_dir.mkdir(parents=True, exist_ok=True)
+        unique = list(dict.fromkeys(urls))
+        summary = DownloadSummary()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.download, url) for url in unique]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                summary.results.append(result)
+                self._save_meta()
+                if progress:
+                    detail = result.error if result.status == "failed" else f"{result.bytes / 1024:.0f} KB"
+                    progress(f"[{done}/{len(unique)}] {result.status}: {filename_for(result.url)} ({detail})")
+        summary.seconds = time.perf_counter() - started
+        return summary
@@ -0,0 +1,174 @@
+"""
+Image handoff between the generator and the video editor.
+The generator writes each frame as raw RGB (memory-mappable, no PNG encode or
+decode) or as a low-compression PNG, together with an ordered manifest. The
+editor reads the manifest instead of scanning the output directory. The
+manifest carries a run id (a hash of the prompt file) and is only marked
+complete once every frame is written, so frames left behind by a crashed or
+earlier run are not mistaken for the current ones.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from typing import List, Optional
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+HANDOFF_FORMATS = ("raw", "png")
+
+# Raw frames carry their size in the file name, e.g. frame_003_1280x1920.rgb
+RAW_NAME_RE = re.compile(r"_(\d+)x(\d+)\.rgb$")
+
+
+def run_id_for(prompt_file: str) -> Optional[str]:
+    """Return the run id of a prompt file (SHA-256 of its contents), or None if it cannot be read."""
+    try:
+        with open(prompt_file, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def to_rgb_uint8(image) -> np.ndarray:
+    """
+    Convert a ComfyUI image (float tensor or array in [0, 1], HxWx3) to uint8 RGB.
+
+    Args:
+        image: Torch tensor or NumPy array
+
+    Returns:
+        Contiguous HxWx3 uint8 array
+    """
+    if hasattr(image, "detach"):
+        image = image.detach().cpu().numpy()
+    array = np.asarray(image)
+    if array.dtype != np.uint8:
+        array = np.clip(array * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(array[..., :3])
+
+
+def raw_frame_size(path: str) -> Optional[tuple]:
+    """Return (width, height) encoded in a raw frame file name, or None."""
+    match = RAW_NAME_RE.search(path)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def ffmpeg_input_args(path: str) -> List[str]:
+    """
+    Build the FFmpeg input arguments that read one still image.
+
+    Raw frames are read with the rawvideo demuxer as a single frame; other
+    images are looped like before.
+
+    Args:
+        path: Path to a raw frame or an image file
+
+    Returns:
+        List of FFmpeg arguments ending with the input path
+    """
+    size = raw_frame_size(path)
+    if size:
+        return ["-f", "rawvideo", "-pix_fmt", "rgb24", "-video_size", f"{size[0]}x{size[1]}", "-i", path]
+    return ["-loop", "1", "-i", path]
+
+
+def load_frame(path: str) -> np.ndarray:
+    """
+    Open a handoff frame as an HxWx3 uint8 array.
+
+    Raw frames are memory-mapped rather than read into memory.
+
+    Args:
+        path: Path to a raw frame or an image file
+
+    Returns:
+        Image array
+    """
+    size = raw_frame_size(path)
+    if size:
+        return np.memmap(path, dtype=np.uint8, mode="r", shape=(size[1], size[0], 3))
+    from PIL import Image
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+class HandoffWriter:
+    """Write generated frames and keep an ordered manifest up to date."""
+
+    def __init__(self, directory: str, fmt: str = "raw", run_id: Optional[str] = None):
+        if fmt not in HANDOFF_FORMATS:
+            raise ValueError(f"Unknown handoff format: {fmt}")
+        self.directory = directory
+        self.fmt = fmt
+        self.run_id = run_id
+        self.complete = False
+        self.frames: List[dict] = []
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, index: int, image) -> str:
+        """
+        Write one frame and record it in the manifest.
+
+        Args:
+            index: Position of the frame in the video
+            image: ComfyUI image tensor or array (HxWx3)
+
+        Returns:
+            Path of the written frame
+        """
+        frame = to_rgb_uint8(image)
+        height, width = frame.shape[:2]
+        if self.fmt == "raw":
+            path = os.path.join(self.directory, f"frame_{index:03d}_{width}x{height}.rgb")
+            frame.tofile(path)
+        else:
+            from PIL import Image
+            path = os.path.join(self.directory, f"frame_{index:03d}.png")
+            Image.fromarray(frame).save(path, compress_level=1)
+        self.frames.append({"index": index, "path": path, "width": width, "height": height})
+        self._write_manifest()
+        return path
+
+    def close(self) -> None:
+        """Mark the manifest complete once every frame has been written."""
+        self.complete = True
+        self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"format": self.fmt, "run_id": self.run_id, "complete": self.complete,
+                       "frames": sorted(self.frames, key=lambda e: e["index"])}, f, indent=2)
+        os.replace(temp_path, manifest_path)
+
+
+def read_manifest(directory: str, run_id: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Read the ordered frame paths of a handoff directory.
+
+    Args:
+        directory: Handoff directory
+        run_id: Run id of the current prompts (see run_id_for()); a manifest from another run is ignored
+
+    Returns:
+        Frame paths in video order, or None if there is no complete manifest for this run
+    """
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not manifest.get("complete") or run_id is None or manifest.get("run_id") != run_id:
+        return None
+    return [entry["path"] for entry in sorted(manifest.get("frames", []), key=lambda e: e["index"])]
@@ -0,0 +1,174 @@
+"""
+On-disk HTTP response cache for NewsCheck page fetches.
+Bodies are stored with their ETag and Last-Modified validators. Entries younger
+than the TTL are served without a request; older ones are revalidated with
+If-None-Match / If-Modified-Since, and a 304 answer reuses the stored body.
+Entries that stay stale for longer than max_stale are deleted when the cache is
+opened and saved, and the rest is evicted least recently used first once the
+cache exceeds its size cap.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "http")
+DEFAULT_TTL_SECONDS = 6 * 3600
+DEFAULT_MAX_MB = 200
+# How long a stale entry is kept for revalidation before it is deleted
+DEFAULT_MAX_STALE_SECONDS = 24 * 3600
+
+
+class HTTPCache:
+    """Size-capped LRU cache of page bodies with HTTP validators."""
+
+    def __init__(self, directory: Union[str, Path] = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL_SECONDS,
+                 max_mb: float = DEFAULT_MAX_MB, max_stale: float = DEFAULT_MAX_STALE_SECONDS):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.index_path = self.directory / "index.json"
+        self.lock = threading.Lock()
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                self.entries: Dict[str, dict] = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        self.prune_expired()
+
+    @staticmethod
+    def _filename(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest() + ".html"
+
+    def _read_body(self, entry: dict) -> Optional[str]:
+        try:
+            return (self.directory / entry["file"]).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def get_fresh(self, url: str) -> Optional[str]:
+        """
+        Return the cached body of url if it is younger than the TTL.
+
+        Args:
+            url: Page URL
+
+        Returns:
+            Body text, or None if the entry is missing or stale
+        """
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry is None or time.time() - entry["fetched_at"] > self.ttl:
+            return None
+        body = self._read_body(entry)
+        if body is not None:
+            with self.lock:
+                entry["last_used"] = time.time()
+                self.fresh_hits += 1
+        return body
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Return the conditional request headers for a stale entry (empty if there is none)."""
+        with self.lock:
+            entry = self.entries.get(url)
+        headers = {}
+        if entry and (self.directory / entry["file"]).exists():
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def not_modified(self, url: str) -> Optional[str]:
+        """Record a 304 answer for url and return the stored body."""
+        with self.lock:
+            entry = self.entries.get(url)
+        body = self._read_body(entry) if entry else None
+        if body is not None:
+            with self.lock:
+                entry["fetched_at"] = entry["last_used"] = time.time()
+                self.revalidated += 1
+        return body
+
+    def store(self, url: str, body: str, headers) -> None:
+        """
+        Store a 200 response unless it forbids caching.
+
+        Args:
+            url: Page URL
+            body: Decoded body text
+            headers: Response headers (mapping)
+        """
+        with self.lock:
+            self.misses += 1
+        if "no-store" in headers.get("Cache-Control", "").lower():
+            return
+        filename = self._filename(url)
+        path = self.directory / filename
+        path.write_text(body, encoding="utf-8")
+        now = time.time()
+        with self.lock:
+            self.entries[url] = {
+                "file": filename,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "bytes": path.stat().st_size,
+                "fetched_at": now,
+                "last_used": now,
+            }
+
+    def _remove(self, url: str) -> int:
+        """Delete the body of url and drop its entry (lock held); returns its size."""
+        entry = self.entries.pop(url)
+        try:
+            (self.directory / entry["file"]).unlink()
+        except FileNotFoundError:
+            pass
+        return entry["bytes"]
+
+    def prune_expired(self) -> int:
+        """Remove entries stale for longer than max_stale; returns the number removed."""
+        cutoff = time.time() - self.ttl - self.max_stale
+        with self.lock:
+            expired = [url for url, entry in self.entries.items() if entry["fetched_at"] < cutoff]
+            for url in expired:
+                self._remove(url)
+        return len(expired)
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits its cap; returns the number removed."""
+        removed = 0
+        with self.lock:
+            total = sum(entry["bytes"] for entry in self.entries.values())
+            for url, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+                if total <= self.max_bytes:
+                    break
+                total -= self._remove(url)
+                removed += 1
+        return removed
+
+    def save(self) -> None:
+        """Prune expired entries, evict over-cap ones and persist the index."""
+        self.prune_expired()
+        self.evict()
+        with self.lock:
+            temp_path = self.index_path.with_suffix(".tmp")
+            with temp_path.open("w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+            os.replace(temp_path, self.index_path)
+
+    def summary(self) -> str:
+        lookups = self.fresh_hits + self.revalidated + self.misses
+        hits = self.fresh_hits + self.revalidated
+        rate = hits / lookups if lookups else 0.0
+        return (f"HTTP cache: {self.fresh_hits} fresh, {self.revalidated} revalidated, "
+                f"{self.misses} downloaded ({rate:.0%} hit rate)")
@@ -0,0 +1,127 @@
+"""
+Lightweight keyword extraction for image prompts.
+This module needs no corpora downloads: it uses a precompiled stopword set, a
+regex tokenizer and a small TF-IDF scorer over the paragraphs of the script.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Iterable, List, Optional
+
+STOPWORDS = frozenset("""
+a about above after again against ain all am an and any are aren aren't as at be because been before being
+below between both but by can couldn couldn't d did didn didn't do does doesn doesn't doing don don't down
+during each few for from further had hadn hadn't has hasn hasn't have haven haven't having he her here hers
+herself him himself his how i if in into is isn isn't it it's its itself just ll m ma me mightn mightn't more
+most mustn mustn't my myself needn needn't no nor not now o of off on once only or other our ours ourselves
+out over own re s same shan shan't she she's should should've shouldn shouldn't so some such t than that
+that'll the their theirs them themselves then there these they this those through to too under until up ve
+very was wasn wasn't we were weren weren't what when where which while who whom why will with won won't
+wouldn wouldn't y you you'd you'll you're you've your yours yourself yourselves also said says would could
+may might must shall one two us like get got
+""".split())
+
+TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z'-]*[A-Za-z]|[A-Za-z]")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of tokens in order of appearance
+    """
+    return [token.lower() for token in TOKEN_RE.findall(text)]
+
+
+def content_words(text: str) -> List[str]:
+    """
+    Tokenize text and drop stopwords and single letters.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of content words in order of appearance
+    """
+    return [token for token in tokenize(text) if len(token) > 1 and token not in STOPWORDS]
+
+
+def first_sentence(text: str) -> str:
+    """
+    Get the first sentence of a paragraph.
+
+    Args:
+        text: Paragraph text
+
+    Returns:
+        The first sentence, or an empty string for blank text
+    """
+    text = text.strip()
+    if not text:
+        return ""
+    return SENTENCE_END_RE.split(text, maxsplit=1)[0]
+
+
+class KeywordExtractor:
+    """Score keywords by TF-IDF against the paragraphs of one script."""
+
+    def __init__(self, documents: Optional[Iterable[str]] = None):
+        self.document_count = 0
+        self.document_frequency: Counter = Counter()
+        for document in documents or []:
+            self.add_document(document)
+
+    def add_document(self, document: str) -> None:
+        """Count the words of a document towards the inverse document frequency."""
+        self.document_count += 1
+        self.document_frequency.update(set(content_words(document)))
+
+    def idf(self, word: str) -> float:
+        """Smoothed inverse document frequency of a word."""
+        return math.log((1 + self.document_count) / (1 + self.document_frequency[word])) + 1.0
+
+    def extract(self, text: str, top_k: int = 8) -> List[str]:
+        """
+        Extract the key words of a paragraph.
+
+        Only the first sentence is used, as it usually carries the most important
+        information. Words are ranked by TF-IDF and returned in their original order.
+
+        Args:
+            text: Paragraph text
+            top_k: Maximum number of keywords to return
+
+        Returns:
+            List of keywords
+        """
+        words = content_words(first_sentence(text))
+        if not words:
+            return []
+        term_frequency = Counter(words)
+        ranked = sorted(term_frequency, key=lambda w: term_frequency[w] * self.idf(w), reverse=True)
+        selected = set(ranked[:top_k])
+        keywords = []
+        for word in words:
+            if word in selected and word not in keywords:
+                keywords.append(word)
+        return keywords
+
+
+def extract_keywords(text: str, top_k: int = 8) -> str:
+    """
+    Extract key words from a single paragraph without any corpus statistics.
+
+    Args:
+        text: Paragraph text
+        top_k: Maximum number of keywords to return
+
+    Returns:
+        Space separated keywords
+    """
+    return ' '.join(KeywordExtractor([text]).extract(text, top_k=top_k))
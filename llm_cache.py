@@ -0,0 +1,123 @@
+"""
+SQLite cache of chat completion responses.
+A response is keyed by the SHA-256 of the model name, the exact message list
+and the sampling parameters, so re-running NewsCheck on the same query or
+re-cleaning the same scraped text is answered without touching the model.
+Set LLM_CACHE=off (or pass bypass=True) to ignore cached answers; fresh answers
+are still stored and replace the old ones.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "llm_responses.sqlite3")
+BYPASS_ENV = "LLM_CACHE"
+
+
+def bypass_from_env() -> bool:
+    """Return True if the LLM_CACHE environment variable turns cached answers off."""
+    return os.environ.get(BYPASS_ENV, "").strip().lower() in ("0", "off", "no", "false", "bypass")
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], params: Dict[str, object]) -> str:
+    """
+    Compute the cache key of a completion request.
+
+    Args:
+        model: Model identifier
+        messages: OpenAI-style message list
+        params: Sampling and length parameters sent with the request
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps({"model": model, "messages": messages, "params": params},
+                         sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Thread-safe SQLite store of completion texts and their token usage."""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_CACHE_PATH, bypass: Optional[bool] = None):
+        """
+        Args:
+            path: SQLite database file
+            bypass: Ignore stored answers (defaults to the LLM_CACHE environment variable)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.bypass = bypass_from_env() if bypass is None else bypass
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, content TEXT, prompt_tokens INTEGER, "
+                "completion_tokens INTEGER, latency REAL, created REAL, last_used REAL, hits INTEGER DEFAULT 0)")
+
+    def get(self, key: str) -> Optional[Tuple[str, int, int]]:
+        """
+        Look up a stored answer.
+
+        Args:
+            key: Key from cache_key()
+
+        Returns:
+            (content, prompt tokens, completion tokens), or None on a miss or when bypassed
+        """
+        if self.bypass:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT content, prompt_tokens, completion_tokens, latency FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[3] or 0.0
+            with self.connection:
+                self.connection.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                                        (time.time(), key))
+        return row[0], row[1], row[2]
+
+    def put(self, key: str, model: str, content: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+            latency: float = 0.0) -> None:
+        """Store (or replace) the answer of a request."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, content, prompt_tokens, completion_tokens, latency, created, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, model, content, prompt_tokens, completion_tokens, latency, now, now))
+
+    def prune(self, max_age_days: float = 30.0) -> int:
+        """Delete answers unused for max_age_days; returns the number deleted."""
+        cutoff = time.time() - max_age_days * 86400
+        with self.lock, self.connection:
+            return self.connection.execute("DELETE FROM responses WHERE last_used < ?", (cutoff,)).rowcount
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        state = " (bypassed)" if self.bypass else ""
+        return (f"LLM cache{state}: {self.hits} hits, {self.misses} misses ({rate:.0%} hit rate), "
+                f"{self.saved_seconds:.1f}s of generation saved")
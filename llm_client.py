@@ -0,0 +1,339 @@
+"""
+Client for the local LM Studio server with bounded, adaptive concurrency.
+Every chat completion passes through one limiter whose ceiling is the number of
+parallel prediction slots of the server: the slots argument, the LLM_SLOTS
+environment variable, the total_slots a llama.cpp-style /props endpoint
+reports once the server is up, or LM Studio's default of 4. Callers can submit
+all their work at once: the limiter alone decides how much of it reaches the
+server. The limit itself follows AIMD: it grows by one request per round
+of fast completions and shrinks by a quarter when a request turns out slow,
+which is what happens once requests start queueing in the server, or when a
+request fails or times out. Every request is streamed so both phases can be
+timed on their own: decoding by the seconds per token after the first one,
+prompt processing by the time to the first token, expected to be at most the
+fastest first token plus the fastest time per prompt token seen recently times
+the prompt length. A long prompt therefore does not pass for a queued request.
+Requests waiting for a slot wait here
+instead of in the server queue, where they would run into HTTP timeouts.
+Queue wait, latency and token counts are recorded for every request. With an
+LLMCache, repeated requests are answered from disk without taking a slot.
+stream_chat() yields the reply as it is generated, so consumers can start on
+the first sentences while the model is still decoding.
+"""
+
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from openai import OpenAI
+
+from llm_cache import LLMCache, cache_key
+
+DEFAULT_BASE_URL = "http://localhost:1234/v1"
+DEFAULT_MODEL = "dolphin3.0-llama3.1-8b@q3_k_s"
+SLOTS_ENV = "LLM_SLOTS"
+# LM Studio's default "max concurrent predictions"; it does not report its slots, and AIMD
+# lowers the limit if a server decodes fewer requests at once
+DEFAULT_SLOTS = 4
+DEFAULT_TIMEOUT = 300.0
+# A request is "slow" when its decode speed or its time to the first token exceeds the recent best by
+# this factor; two requests sharing one slot take twice as long, so queueing is caught as soon as it starts
+SLOW_FACTOR = 1.5
+# Completed requests the baselines are taken from
+BASELINE_WINDOW = 20
+# Servers that do not report usage are assumed to tokenise about this many characters per token
+CHARS_PER_TOKEN = 4
+DECREASE_FACTOR = 0.75
+
+
+def server_slots(base_url: str = DEFAULT_BASE_URL) -> Optional[int]:
+    """Return the parallel slots the server reports on /props (llama.cpp's total_slots), or None."""
+    try:
+        response = requests.get(f"{base_url.rstrip('/').removesuffix('/v1')}/props", timeout=2)
+        if response.ok:
+            return int(response.json().get("total_slots") or 0) or None
+    except (requests.RequestException, ValueError, TypeError, AttributeError):
+        pass
+    return None
+
+
+def configured_slots() -> Optional[int]:
+    """Return the slots set with the LLM_SLOTS environment variable, or None."""
+    value = os.environ.get(SLOTS_ENV, "").strip()
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+
+@dataclass
+class RequestTiming:
+    wait: float
+    latency: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    error: str = ""
+    cached: bool = False
+    first_token: Optional[float] = None  # seconds to the first streamed token
+
+
+class AdaptiveLimiter:
+    """Concurrency limit between 1 and max_limit adjusted by additive increase, multiplicative decrease."""
+
+    def __init__(self, max_limit: int, initial: Optional[float] = None, window: int = BASELINE_WINDOW):
+        self.max_limit = max(1, max_limit)
+        self.limit = float(min(self.max_limit, initial or 1))
+        self.active = 0
+        # Windowed minimums follow real changes in speed without drifting on their own
+        self.decode = deque(maxlen=window)  # seconds per generated token after the first
+        self.first_token = deque(maxlen=window)  # seconds to the first token
+        self.prefill = deque(maxlen=window)  # seconds to the first token per prompt token
+        self.condition = threading.Condition()
+
+    def set_max_limit(self, max_limit: int) -> None:
+        """Change the ceiling, e.g. once the server has reported its slots."""
+        with self.condition:
+            self.max_limit = max(1, max_limit)
+            self.limit = min(self.limit, float(self.max_limit))
+            self.condition.notify_all()
+
+    def acquire(self) -> None:
+        with self.condition:
+            while self.active >= int(self.limit):
+                self.condition.wait()
+            self.active += 1
+
+    def _slow(self, first_token: Optional[float], prompt_tokens: int, decode: Optional[float]) -> bool:
+        """Compare a request with the recent baselines, then add it to them."""
+        slow = False
+        if decode is not None:
+            slow = bool(self.decode) and decode > min(self.decode) * SLOW_FACTOR
+            self.decode.append(decode)
+        if first_token is not None:
+            if self.first_token:
+                # Fixed overhead plus prompt processing; both minimums overestimate, so this errs towards fast
+                expected = min(self.first_token) + (min(self.prefill) * prompt_tokens if self.prefill else 0.0)
+                slow = slow or first_token > expected * SLOW_FACTOR
+            self.first_token.append(first_token)
+            if prompt_tokens > 0:
+                self.prefill.append(first_token / prompt_tokens)
+        return slow
+
+    def release(self, first_token: Optional[float] = None, prompt_tokens: int = 0,
+                decode: Optional[float] = None, failed: bool = False) -> None:
+        """
+        Free a slot and adapt the limit to the request's outcome.
+
+        Args:
+            first_token: Seconds to the first generated token (None if nothing was generated)
+            prompt_tokens: Tokens of the prompt
+            decode: Seconds per generated token after the first (None with fewer than two tokens)
+            failed: True if the request errored or timed out
+        """
+        with self.condition:
+            self.active -= 1
+            if failed:
+                self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+            elif first_token is not None:
+                if self._slow(first_token, prompt_tokens, decode):
+                    self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                else:
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self.condition.notify_all()
+
+
+class LLMClient:
+    """Chat completions against one OpenAI-compatible server through an adaptive limiter."""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, model: str = DEFAULT_MODEL, slots: Optional[int] = None,
+                 timeout: float = DEFAULT_TIMEOUT, max_retries: int = 1, api_key: str = "Nothing here",
+                 cache: Optional[LLMCache] = None, prepare: Optional[Callable[[], object]] = None):
+        """
+        Args:
+            base_url: Server URL including /v1
+            model: Model identifier sent with every request
+            slots: Parallel predictions the server can run (upper bound of the limit); by default
+                LLM_SLOTS, else what the server reports, else DEFAULT_SLOTS
+            timeout: Seconds allowed per request once it is sent
+            max_retries: Retries of the OpenAI client on connection errors
+            api_key: Key sent to the server (LM Studio ignores it)
+            cache: Optional response cache consulted before every request
+            prepare: Called once before the first request that reaches the server
+                (e.g. loading the model), so fully cached runs skip it
+        """
+        self.model = model
+        self.base_url = base_url
+        self.client = OpenAI(base_url=base_url, api_key=api_key, timeout=timeout, max_retries=max_retries)
+        slots = slots or configured_slots()
+        # Without an explicit setting the server is asked after prepare, once it is up
+        self.slots_known = slots is not None
+        self.limiter = AdaptiveLimiter(slots or DEFAULT_SLOTS)
+        self.cache = cache
+        self.prepare = prepare
+        self.prepare_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.timings: List[RequestTiming] = []
+
+    @property
+    def slots(self) -> int:
+        return self.limiter.max_limit
+
+    def _cached(self, model: str, messages: List[Dict[str, str]], params: dict,
+                use_cache: bool) -> Tuple[Optional[str], Optional[str]]:
+        """Return (cache key, cached content); both None without a cache."""
+        if self.cache is None or not use_cache:
+            return None, None
+        key = cache_key(model, messages, params)
+        hit = self.cache.get(key)
+        if hit is None:
+            return key, None
+        content, prompt_tokens, completion_tokens = hit
+        self._record(RequestTiming(0.0, 0.0, prompt_tokens, completion_tokens, cached=True))
+        return key, content
+
+    def _begin(self) -> Tuple[RequestTiming, float]:
+        """Run the prepare hook once and wait for a slot; returns the timing and the start time."""
+        queued = time.perf_counter()
+        if self.prepare is not None:
+            with self.prepare_lock:
+                if self.prepare is not None:
+                    self.prepare()
+                    self.prepare = None
+        if not self.slots_known:
+            with self.prepare_lock:
+                if not self.slots_known:
+                    # Ask only once; a server without /props keeps the default
+                    reported = server_slots(self.base_url)
+                    if reported is not None:
+                        self.limiter.set_max_limit(reported)
+                    self.slots_known = True
+        self.limiter.acquire()
+        started = time.perf_counter()
+        return RequestTiming(wait=started - queued, latency=0.0), started
+
+    def _finish(self, timing: RequestTiming, started: float) -> None:
+        timing.latency = time.perf_counter() - started
+        if timing.error:
+            self.limiter.release(failed=True)
+        else:
+            decode = None
+            if timing.first_token is not None and timing.completion_tokens > 1:
+                decode = (timing.latency - timing.first_token) / (timing.completion_tokens - 1)
+            self.limiter.release(timing.first_token, timing.prompt_tokens, decode)
+        self._record(timing)
+
+    def chat(self, messages: List[Dict[str, str]], use_cache: bool = True, **params) -> str:
+        """
+        Run one chat completion.
+
+        The reply is streamed from the server and joined, so the limiter can
+        time the first token and the decoding separately.
+
+        Args:
+            messages: OpenAI-style message list
+            use_cache: Consult and update the response cache for this call
+            **params: Extra completion parameters (temperature, max_tokens, ...)
+
+        Returns:
+            Text of the first choice
+        """
+        return "".join(self.stream_chat(messages, use_cache, **params))
+
+    def stream_chat(self, messages: List[Dict[str, str]], use_cache: bool = True, **params) -> Iterator[str]:
+        """
+        Run one chat completion and yield the reply in pieces as it is generated.
+
+        The slot is held until the generator is exhausted or closed. A cached
+        reply is yielded as a single piece; a reply is only cached once it has
+        been streamed completely.
+
+        Args:
+            messages: OpenAI-style message list
+            use_cache: Consult and update the response cache for this call
+            **params: Extra completion parameters (temperature, max_tokens, ...)
+
+        Yields:
+            Text deltas of the first choice
+        """
+        model = params.pop("model", self.model)
+        key, content = self._cached(model, messages, params, use_cache)
+        if content is not None:
+            yield content
+            return
+        timing, started = self._begin()
+        pieces: List[str] = []
+        usage = None
+        try:
+            stream = self.client.chat.completions.create(
+                model=model, messages=messages, stream=True,
+                stream_options={"include_usage": True}, **params)  # type: ignore
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if not pieces:
+                        timing.first_token = time.perf_counter() - started
+                    pieces.append(delta)
+                    yield delta
+        except Exception as e:
+            timing.error = type(e).__name__
+            raise
+        finally:
+            if usage is not None:
+                timing.prompt_tokens = usage.prompt_tokens or 0
+                timing.completion_tokens = usage.completion_tokens or 0
+            if not timing.prompt_tokens:
+                timing.prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // CHARS_PER_TOKEN
+            if not timing.completion_tokens:
+                # llama.cpp-based servers send one content delta per token
+                timing.completion_tokens = len(pieces)
+            self._finish(timing, started)
+        if key is not None:
+            self.cache.put(key, model, "".join(pieces), timing.prompt_tokens, timing.completion_tokens,
+                           timing.latency)
+
+    def complete(self, system: str, text: str, **params) -> str:
+        """Run a completion with a system prompt and one user message."""
+        return self.chat([{"role": "system", "content": system}, {"role": "user", "content": text}], **params)
+
+    def _record(self, timing: RequestTiming) -> None:
+        with self.lock:
+            self.timings.append(timing)
+
+    def stats(self) -> Dict[str, float]:
+        """Aggregate request metrics."""
+        with self.lock:
+            timings = list(self.timings)
+        done = [t for t in timings if not t.error and not t.cached]
+        latencies = sorted(t.latency for t in done)
+        generated = sum(t.completion_tokens for t in done)
+        busy = sum(latencies)
+        sent = [t for t in timings if not t.cached]
+        first = [t.first_token for t in done if t.first_token is not None]
+        return {
+            "requests": len(timings),
+            "cached": len(timings) - len(sent),
+            "errors": sum(1 for t in sent if t.error),
+            "mean_wait": statistics.fmean(t.wait for t in sent) if sent else 0.0,
+            "p50_latency": latencies[len(latencies) // 2] if latencies else 0.0,
+            "p95_latency": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+            "prompt_tokens": sum(t.prompt_tokens for t in done),
+            "completion_tokens": generated,
+            "tokens_per_second": generated / busy if busy else 0.0,
+            "limit": self.limiter.limit,
+            "mean_first_token": statistics.fmean(first) if first else 0.0,
+        }
+
+    def summary(self) -> str:
+        s = self.stats()
+        text = (f"LLM: {s['requests']} requests ({s['cached']} cached, {s['errors']} failed), "
+                f"latency p50 {s['p50_latency']:.1f}s p95 {s['p95_latency']:.1f}s, mean wait {s['mean_wait']:.1f}s, "
+                f"{s['prompt_tokens']} prompt + {s['completion_tokens']} generated tokens "
+                f"({s['tokens_per_second']:.1f} tok/s per request), concurrency {s['limit']:.1f}/{self.slots}")
+        if s["mean_first_token"]:
+            text += f", first streamed token after {s['mean_first_token']:.1f}s"
+        if self.cache is not None:
+            text += "\n" + self.cache.summary()
+        return text
@@ -0,0 +1,127 @@
+"""
+Keep the LM Studio server and model warm between runs.
+Instead of starting the server, loading the model and unloading everything on
+every run, ensure_model() asks the server over HTTP what is already running and
+only starts or loads what is missing. Models are loaded with an idle TTL, so LM
+Studio unloads them by itself once no run has used them for a while, and
+readiness is probed over HTTP instead of sleeping for a fixed time.
+"""
+
+import time
+from typing import List, Optional
+
+import requests
+
+from helper import run_subprocess
+from llm_client import DEFAULT_BASE_URL, DEFAULT_MODEL
+
+DEFAULT_MODEL_PATH = "cognitivecomputations/Dolphin3.0-Llama3.1-8B-GGUF/Dolphin3.0-Llama3.1-8B-Q3_K_S.gguf"
+CONTEXT_LENGTH = 8096
+# Seconds without requests after which LM Studio unloads the model
+IDLE_TTL = 30 * 60
+READY_TIMEOUT = 180.0
+PROBE_INTERVAL = 0.5
+
+
+def _server_root(base_url: str) -> str:
+    return base_url.rstrip("/").removesuffix("/v1")
+
+
+def server_running(base_url: str = DEFAULT_BASE_URL) -> bool:
+    """Return True if the server answers on its OpenAI-compatible API."""
+    try:
+        return requests.get(f"{base_url.rstrip('/')}/models", timeout=2).ok
+    except requests.RequestException:
+        return False
+
+
+def loaded_models(base_url: str = DEFAULT_BASE_URL) -> List[str]:
+    """
+    List the identifiers of the models currently loaded.
+
+    LM Studio's REST API reports a state per model; /v1/models lists every
+    downloaded model when just-in-time loading is on, so it is only used when
+    the REST API is missing.
+
+    Args:
+        base_url: Server URL including /v1
+
+    Returns:
+        Loaded model identifiers (empty if the server is down)
+    """
+    try:
+        response = requests.get(f"{_server_root(base_url)}/api/v0/models", timeout=2)
+        if response.ok:
+            return [m["id"] for m in response.json().get("data", []) if m.get("state") == "loaded"]
+        response = requests.get(f"{base_url.rstrip('/')}/models", timeout=2)
+        if response.ok:
+            return [m["id"] for m in response.json().get("data", [])]
+    except (requests.RequestException, ValueError, KeyError):
+        pass
+    return []
+
+
+def _is_loaded(model: str, base_url: str) -> bool:
+    # Loaded variants may be reported without the @quantization suffix
+    return any(loaded in (model, model.split("@")[0]) for loaded in loaded_models(base_url))
+
+
+def wait_until_ready(model: str = DEFAULT_MODEL, base_url: str = DEFAULT_BASE_URL,
+                     timeout: float = READY_TIMEOUT) -> bool:
+    """
+    Poll the server until model is loaded.
+
+    Args:
+        model: Model identifier
+        base_url: Server URL including /v1
+        timeout: Seconds to wait at most
+
+    Returns:
+        True once the model is ready, False on timeout
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _is_loaded(model, base_url):
+            return True
+        time.sleep(PROBE_INTERVAL)
+    return False
+
+
+def ensure_model(model_path: str = DEFAULT_MODEL_PATH, model: str = DEFAULT_MODEL,
+                 base_url: str = DEFAULT_BASE_URL, context_length: int = CONTEXT_LENGTH,
+                 idle_ttl: Optional[int] = IDLE_TTL, timeout: float = READY_TIMEOUT) -> bool:
+    """
+    Make sure the server is up and model is loaded, doing only what is missing.
+
+    Args:
+        model_path: Model to pass to "lms load"
+        model: Identifier the server reports once it is loaded
+        base_url: Server URL including /v1
+        context_length: Context length to load the model with
+        idle_ttl: Seconds of inactivity before LM Studio unloads the model (None keeps it loaded)
+        timeout: Seconds to wait for the server and the model
+
+    Returns:
+        True if the model is ready
+    """
+    started = time.perf_counter()
+    if not server_running(base_url):
+        print("LM Studio server is not running, starting it")
+        run_subprocess("lms server start")
+        deadline = time.monotonic() + timeout
+        while not server_running(base_url) and time.monotonic() < deadline:
+            time.sleep(PROBE_INTERVAL)
+    if _is_loaded(model, base_url):
+        print(f"Model {model} already loaded")
+        return True
+    command = f"lms load {model_path} --context-length {context_length} --gpu max"
+    if idle_ttl:
+        command += f" --ttl {int(idle_ttl)}"
+    print(f"Loading {model}")
+    run_subprocess(command)
+    ready = wait_until_ready(model, base_url, timeout)
+    if ready:
+        print(f"Model {model} ready after {time.perf_counter() - started:.1f}s")
+    else:
+        print(f"Model {model} not ready after {timeout:.0f}s")
+    return ready
@@ -0,0 +1,140 @@
+"""
+Peak RSS budgeting and measurement for CPU-only image generation.
+The generator uses this module to pick a VAE decode tile size and decode batch
+size that fit a resident memory budget, and to report peak RSS per image.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+# Rough working memory of a full-resolution SDXL VAE decode, per output pixel (fp32)
+DECODE_BYTES_PER_PIXEL = 2560
+
+# Tile sizes accepted by ComfyUI's VAEDecodeTiled, largest first
+TILE_SIZES = (1024, 768, 512, 384, 256, 128)
+
+# Fraction of the remaining budget a single decode may use
+DECODE_HEADROOM = 0.8
+
+
+def current_rss_mb() -> float:
+    """Resident set size of the current process in MB."""
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def default_budget_mb() -> int:
+    """Default peak RSS budget: 75% of the machine's physical memory."""
+    return int(psutil.virtual_memory().total / (1024 * 1024) * 0.75)
+
+
+def estimate_decode_mb(width: int, height: int, batch_size: int = 1) -> float:
+    """
+    Estimate the working memory of decoding a latent tile or image.
+
+    Args:
+        width: Decoded width in pixels
+        height: Decoded height in pixels
+        batch_size: Number of images decoded together
+
+    Returns:
+        Estimated memory in MB
+    """
+    return width * height * batch_size * DECODE_BYTES_PER_PIXEL / (1024 * 1024)
+
+
+def plan_decode(budget_mb: float, width: int, height: int, max_batch_size: int = 4,
+                baseline_mb: Optional[float] = None) -> Tuple[int, int]:
+    """
+    Pick the largest decode tile size and batch size that fit the budget.
+
+    Batch size is lowered first, then tile size. If even the smallest tile does
+    not fit, the smallest tile and a batch size of 1 are returned.
+
+    Args:
+        budget_mb: Peak RSS budget in MB
+        width: Image width in pixels
+        height: Image height in pixels
+        max_batch_size: Largest number of latents decoded at once
+        baseline_mb: Memory already in use (defaults to the current RSS)
+
+    Returns:
+        Tuple of (tile_size, batch_size)
+    """
+    if baseline_mb is None:
+        baseline_mb = current_rss_mb()
+    available = max(0.0, budget_mb - baseline_mb) * DECODE_HEADROOM
+    for tile_size in TILE_SIZES:
+        tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+        for batch_size in range(max(1, max_batch_size), 0, -1):
+            if estimate_decode_mb(tile_w, tile_h, batch_size) <= available:
+                return tile_size, batch_size
+    return TILE_SIZES[-1], 1
+
+
+class RSSMonitor:
+    """Sample the process RSS in a background thread and record peaks per label."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peaks: Dict[str, float] = {}
+        self._active: List[str] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "RSSMonitor":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _record(self) -> None:
+        rss = current_rss_mb()
+        with self._lock:
+            for label in self._active:
+                self.peaks[label] = max(self.peaks.get(label, 0.0), rss)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._record()
+            time.sleep(self.interval)
+
+    @contextmanager
+    def track(self, *labels: str):
+        """Record the peak RSS seen while the block runs under each label."""
+        with self._lock:
+            self._active.extend(labels)
+        self._record()
+        try:
+            yield
+        finally:
+            self._record()
+            with self._lock:
+                for label in labels:
+                    self._active.remove(label)
+
+    def report(self, path: Optional[str] = None) -> Dict[str, float]:
+        """
+        Return the recorded peaks in MB, optionally writing them to a JSON file.
+
+        Args:
+            path: Optional JSON output path
+
+        Returns:
+            Dict of label to peak RSS in MB
+        """
+        with self._lock:
+            peaks = {label: round(peak, 1) for label, peak in self.peaks.items()}
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(peaks, f, indent=2)
+        return peaks
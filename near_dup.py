@@ -0,0 +1,160 @@
+"""
+Near-duplicate detection for extracted article text.
+Search results often include syndicated copies of the same wire story. Each
+text is reduced to word 5-shingles, the shingles are MinHashed with 128
+vectorized NumPy hash functions, and locality-sensitive hashing over bands of
+the signatures finds candidate pairs. Pairs whose estimated Jaccard similarity
+reaches the threshold are grouped, and only the longest text of each group is
+kept. Texts too short to yield a shingle (empty or whitespace only) carry no
+evidence of being copies and are never grouped with anything.
+"""
+
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from keywords import tokenize
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs around 0.7 Jaccard or above almost always share a band
+BANDS = 16
+DEFAULT_THRESHOLD = 0.7
+SEED = 1
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+def _permutations(num_perm: int = NUM_PERM, seed: int = SEED) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+_A, _B = _permutations()
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """
+    Hash the word k-shingles of text to 32-bit values.
+
+    Args:
+        text: Text to shingle
+        k: Words per shingle
+
+    Returns:
+        Unique shingle hashes (uint64 holding 32-bit values)
+    """
+    words = tokenize(text)
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    word_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64, count=len(words))
+    if len(words) < k:
+        k = len(words)
+    windows = np.lib.stride_tricks.sliding_window_view(word_hashes, k)
+    # Polynomial combination of the k word hashes; uint64 arithmetic wraps around
+    with np.errstate(over="ignore"):
+        combined = np.zeros(len(windows), dtype=np.uint64)
+        for column in range(k):
+            combined = combined * np.uint64(1000003) + windows[:, column]
+    return np.unique((combined ^ (combined >> np.uint64(32))) & _MASK32)
+
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    """
+    Compute the MinHash signature of a set of shingle hashes.
+
+    Args:
+        hashes: Shingle hashes from shingle_hashes()
+
+    Returns:
+        Signature of NUM_PERM uint32 values (all 0xFFFFFFFF for an empty set)
+    """
+    if not len(hashes):
+        return np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint32)
+    with np.errstate(over="ignore"):
+        # (a * x + b) mod 2^64, keeping the high 32 bits: one row per shingle, one column per hash function
+        values = (hashes[:, None] * _A[None, :] + _B[None, :]) >> np.uint64(32)
+    return values.min(axis=0).astype(np.uint32)
+
+
+def signatures(texts: List[str]) -> np.ndarray:
+    """Stack the MinHash signatures of texts into a (len(texts), NUM_PERM) array."""
+    if not texts:
+        return np.zeros((0, NUM_PERM), dtype=np.uint32)
+    return np.vstack([minhash(shingle_hashes(text)) for text in texts])
+
+
+def duplicate_groups(texts: List[str], threshold: float = DEFAULT_THRESHOLD, bands: int = BANDS) -> List[List[int]]:
+    """
+    Group near-duplicate texts.
+
+    Args:
+        texts: Texts to compare
+        threshold: Minimum estimated Jaccard similarity of shingles
+        bands: LSH bands (NUM_PERM must be divisible by it)
+
+    Returns:
+        Groups of indexes into texts, one per distinct text, each sorted
+    """
+    hashes = [shingle_hashes(text) for text in texts]
+    sigs = (np.vstack([minhash(h) for h in hashes]) if hashes
+            else np.zeros((0, NUM_PERM), dtype=np.uint32))
+    # Texts without shingles all share the empty-set signature; each stays in a group of its own
+    banded = [index for index, h in enumerate(hashes) if len(h)]
+    rows = NUM_PERM // bands
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = defaultdict(list)
+        band_view = np.ascontiguousarray(sigs[banded, band * rows:(band + 1) * rows])
+        for index, row in zip(banded, band_view):
+            buckets[row.tobytes()].append(index)
+        for members in buckets.values():
+            for position, i in enumerate(members):
+                for j in members[position + 1:]:
+                    if (i, j) in checked:
+                        continue
+                    checked.add((i, j))
+                    if np.mean(sigs[i] == sigs[j]) >= threshold:
+                        parent[find(j)] = find(i)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for index in range(len(texts)):
+        groups[find(index)].append(index)
+    return sorted(groups.values())
+
+
+def collapse_duplicates(documents: Dict[str, str],
+                        threshold: float = DEFAULT_THRESHOLD) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Keep one document per group of near-duplicates.
+
+    Args:
+        documents: Dict of URL to extracted text
+        threshold: Minimum estimated Jaccard similarity of shingles
+
+    Returns:
+        (kept documents in their original order, dict of kept URL to the URLs it replaced)
+    """
+    urls = list(documents)
+    kept_urls = set()
+    replaced: Dict[str, List[str]] = {}
+    for group in duplicate_groups([documents[url] for url in urls], threshold):
+        # The longest copy is usually the most complete one
+        keeper = max(group, key=lambda index: len(documents[urls[index]]))
+        kept_urls.add(urls[keeper])
+        others = [urls[index] for index in group if index != keeper]
+        if others:
+            replaced[urls[keeper]] = others
+    return {url: documents[url] for url in urls if url in kept_urls}, replaced
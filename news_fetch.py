@@ -0,0 +1,130 @@
+"""
+Asynchronous page fetcher for NewsCheck.
+All pages of a query are downloaded on one aiohttp session with a shared
+connection pool, a global and a per-host connection limit, timeouts and a cap
+on body size. Compressed responses (gzip, deflate and, when the Brotli package
+is installed, br) are decoded by aiohttp. With an HTTPCache, fresh entries are
+served without a request and stale ones are revalidated conditionally.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import aiohttp
+
+from http_cache import HTTPCache
+
+MAX_CONNECTIONS = 16
+MAX_PER_HOST = 4
+TIMEOUT_SECONDS = 15.0
+MAX_BODY_BYTES = 5 * 1024 * 1024
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+def _accept_encoding() -> str:
+    try:
+        import brotli  # noqa: F401  (aiohttp decodes br only when it is installed)
+        return "gzip, deflate, br"
+    except ImportError:
+        return "gzip, deflate"
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int = 0
+    text: str = ""
+    error: str = ""
+    cached: str = ""  # "fresh" or "revalidated" when the body came from the cache
+
+    @property
+    def ok(self) -> bool:
+        return not self.error and 200 <= self.status < 300
+
+
+def normalize_url(url: str) -> str:
+    """Prefix bare links with https:// like NewsCheck always did."""
+    return url if url.startswith(("https://", "http://")) else "https://" + url
+
+
+async def _fetch_one(session: aiohttp.ClientSession, url: str, max_bytes: int,
+                     cache: Optional[HTTPCache] = None, conditional: bool = True) -> FetchResult:
+    headers = {}
+    if cache is not None and conditional:
+        body = cache.get_fresh(url)
+        if body is not None:
+            return FetchResult(url, 200, body, cached="fresh")
+        headers = cache.validators(url)
+    try:
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304:
+                body = cache.not_modified(url) if cache is not None else None
+                if body is not None:
+                    return FetchResult(url, 200, body, cached="revalidated")
+                if not headers:
+                    return FetchResult(url, 304, error="HTTP 304 without a cached body")
+            elif response.status >= 400:
+                return FetchResult(url, response.status, error=f"HTTP {response.status}")
+            else:
+                length = response.content_length
+                if length is not None and length > max_bytes:
+                    return FetchResult(url, response.status, error=f"Body of {length} bytes exceeds {max_bytes}")
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) > max_bytes:
+                        return FetchResult(url, response.status, error=f"Body exceeds {max_bytes} bytes")
+                encoding = response.get_encoding() if response.charset else "utf-8"
+                text = bytes(body).decode(encoding, errors="replace")
+                if cache is not None and response.status == 200:
+                    cache.store(url, text, response.headers)
+                return FetchResult(url, response.status, text)
+    except (aiohttp.ClientError, asyncio.TimeoutError, LookupError, RuntimeError) as e:
+        return FetchResult(url, error=f"{type(e).__name__}: {e}")
+    # The entry was evicted after its validators were sent, so the 304 has no body to reuse
+    return await _fetch_one(session, url, max_bytes, cache, conditional=False)
+
+
+async def fetch_all_async(urls: Iterable[str], max_connections: int = MAX_CONNECTIONS,
+                          max_per_host: int = MAX_PER_HOST, timeout: float = TIMEOUT_SECONDS,
+                          max_bytes: int = MAX_BODY_BYTES,
+                          session: Optional[aiohttp.ClientSession] = None,
+                          cache: Optional[HTTPCache] = None) -> Dict[str, FetchResult]:
+    """
+    Fetch pages concurrently.
+
+    Args:
+        urls: Page URLs (bare links get https://; duplicates are fetched once)
+        max_connections: Connections open at once across all hosts
+        max_per_host: Connections open at once to one host
+        timeout: Total seconds allowed per request
+        max_bytes: Larger bodies are abandoned
+        session: Existing session to reuse (its limits apply)
+        cache: Optional response cache consulted and updated for every URL
+
+    Returns:
+        Dict of normalized URL to FetchResult
+    """
+    targets = list(dict.fromkeys(normalize_url(url) for url in urls))
+    if not targets:
+        return {}
+    own_session = session is None
+    if own_session:
+        connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=max_per_host, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=timeout, sock_connect=min(timeout, 10.0)),
+            headers={"User-Agent": USER_AGENT, "Accept-Encoding": _accept_encoding()},
+        )
+    try:
+        results = await asyncio.gather(*(_fetch_one(session, url, max_bytes, cache) for url in targets))
+    finally:
+        if own_session:
+            await session.close()
+    return {result.url: result for result in results}
+
+
+def fetch_all(urls: Iterable[str], **options) -> Dict[str, FetchResult]:
+    """Blocking wrapper around fetch_all_async (see it for the options)."""
+    return asyncio.run(fetch_all_async(urls, **options))
@@ -0,0 +1,143 @@
+"""
+Prompt planning for image generation.
+Paragraph prompts that are near-duplicates of each other are merged so that
+each distinct image is generated only once, and an optional cap on distinct
+images per video assigns shared images to adjacent paragraphs. A saved plan
+carries the run id of the prompts it was made for and is ignored by any other
+run.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from keywords import tokenize
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.6
+
+
+def _numpy_tfidf(texts: List[str]) -> np.ndarray:
+    """Build an L2-normalized TF-IDF matrix with NumPy only."""
+    documents = [tokenize(text) for text in texts]
+    vocabulary: Dict[str, int] = {}
+    for words in documents:
+        for word in words:
+            vocabulary.setdefault(word, len(vocabulary))
+    counts = np.zeros((len(texts), max(1, len(vocabulary))), dtype=np.float64)
+    for row, words in enumerate(documents):
+        for word in words:
+            counts[row, vocabulary[word]] += 1.0
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1.0 + len(texts)) / (1.0 + document_frequency)) + 1.0
+    weights = counts * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return weights / np.where(norms == 0, 1.0, norms)
+
+
+def similarity_matrix(texts: List[str]) -> np.ndarray:
+    """
+    Compute pairwise cosine similarity between texts using TF-IDF vectors.
+
+    scikit-learn is used when available, otherwise an equivalent NumPy
+    implementation is used.
+
+    Args:
+        texts: Texts to compare
+
+    Returns:
+        Square matrix of similarities in [0, 1]
+    """
+    if not texts:
+        return np.zeros((0, 0))
+    try:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        vectors = TfidfVectorizer(tokenizer=tokenize, lowercase=False, token_pattern=None).fit_transform(texts)
+        return (vectors @ vectors.T).toarray()
+    except ImportError:
+        vectors = _numpy_tfidf(texts)
+        return vectors @ vectors.T
+    except ValueError:
+        # Every text was empty after tokenization
+        return np.eye(len(texts))
+
+
+def plan_prompts(key_texts: List[str], threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 max_images: Optional[int] = None) -> dict:
+    """
+    Group paragraphs into distinct images.
+
+    Each paragraph joins the first existing image whose representative text is
+    at least `threshold` similar; otherwise it starts a new image. If more than
+    `max_images` images remain, the most similar pair of images that appear next
+    to each other in paragraph order is merged until the cap is met.
+
+    Args:
+        key_texts: Key information of each paragraph, in paragraph order
+        threshold: Cosine similarity above which two paragraphs share an image
+        max_images: Optional cap on distinct images
+
+    Returns:
+        Dict with "assignments" (image index per paragraph), "representatives"
+        (paragraph index whose prompt is used for each image) and "segments"
+        (runs of consecutive paragraphs showing the same image)
+    """
+    similarity = similarity_matrix(key_texts)
+    representatives: List[int] = []
+    assignments: List[int] = []
+    for paragraph in range(len(key_texts)):
+        image = next((i for i, rep in enumerate(representatives) if similarity[paragraph, rep] >= threshold), None)
+        if image is None:
+            image = len(representatives)
+            representatives.append(paragraph)
+        assignments.append(image)
+
+    if max_images is not None and max_images > 0:
+        while len(representatives) > max_images:
+            adjacent = {(min(a, b), max(a, b)) for a, b in zip(assignments, assignments[1:]) if a != b}
+            if not adjacent:
+                break
+            keep, drop = max(adjacent, key=lambda pair: similarity[representatives[pair[0]], representatives[pair[1]]])
+            assignments = [keep if image == drop else image for image in assignments]
+            del representatives[drop]
+            assignments = [image - 1 if image > drop else image for image in assignments]
+
+    segments: List[dict] = []
+    for image in assignments:
+        if segments and segments[-1]["image"] == image:
+            segments[-1]["paragraphs"] += 1
+        else:
+            segments.append({"image": image, "paragraphs": 1})
+
+    return {"assignments": assignments, "representatives": representatives, "segments": segments}
+
+
+def save_plan(plan: dict, path: str) -> None:
+    """Write a prompt plan to a JSON file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=2)
+
+
+def load_plan(path: str, image_count: int, run_id: Optional[str] = None) -> Optional[dict]:
+    """
+    Load a prompt plan, ignoring it if it does not match the generated images.
+
+    Args:
+        path: Path to the plan JSON file
+        image_count: Number of images that were generated
+        run_id: Run id of the current prompts (frame_handoff.run_id_for("promptCheck.txt"))
+
+    Returns:
+        The plan dict, or None if missing or stale
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # A plan left by an earlier run may have the same image count but other paragraphs
+    if run_id is None or plan.get("run_id") != run_id:
+        return None
+    if len(plan.get("representatives", [])) != image_count:
+        return None
+    return plan
@@ -0,0 +1,96 @@
+"""
+Query relevance scoring for NewsCheck.
+Pages and analyses are ranked against the query with BM25 computed on sparse
+term counts from scikit-learn. The vectorizer configuration and the analysed
+query are cached. A text counts as relevant when it contains at least
+MIN_COVERAGE of the distinct query terms. The share does not depend on the
+other candidates, so terms that every on-topic page contains still count in
+full; BM25, whose IDF comes from the candidates, only orders the pages.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+from keywords import STOPWORDS
+
+K1 = 1.5
+B = 0.75
+# Share of the distinct query terms a text must contain to be relevant
+MIN_COVERAGE = 0.5
+
+
+@lru_cache(maxsize=1)
+def _analyzer():
+    """Tokenizer shared by queries and texts: lowercase words of 3+ letters without stopwords."""
+    return CountVectorizer(lowercase=True, token_pattern=r"(?u)\b[^\W\d_]{3,}\b",
+                           stop_words=list(STOPWORDS)).build_analyzer()
+
+
+@lru_cache(maxsize=64)
+def query_terms(query: str) -> Tuple[str, ...]:
+    """Unique terms of a query in order of appearance."""
+    return tuple(dict.fromkeys(_analyzer()(query)))
+
+
+def score(query: str, texts: List[str], k1: float = K1, b: float = B) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score texts against a query.
+
+    Args:
+        query: Search query
+        texts: Texts to score
+        k1: BM25 term frequency saturation
+        b: BM25 length normalization
+
+    Returns:
+        (BM25 scores, share of the distinct query terms present), one value per text
+    """
+    terms = query_terms(query)
+    if not texts or not terms:
+        return np.zeros(len(texts)), np.zeros(len(texts))
+    tokens = [_analyzer()(text) for text in texts]
+    # Texts are analysed once; the vectorizer only counts the query terms
+    vectorizer = CountVectorizer(analyzer=lambda words: words, vocabulary=list(terms))
+    counts = vectorizer.transform(tokens).tocsc().astype(np.float64)
+    lengths = np.array([len(words) for words in tokens], dtype=np.float64)
+    average_length = lengths.mean() or 1.0
+    document_frequency = np.diff(counts.indptr)
+    idf = np.log1p((len(texts) - document_frequency + 0.5) / (document_frequency + 0.5))
+    counts = counts.tocsr()
+    rows = np.repeat(np.arange(len(texts)), np.diff(counts.indptr))
+    tf = counts.data
+    norm = k1 * (1.0 - b + b * lengths[rows] / average_length)
+    weights = idf[counts.indices] * tf * (k1 + 1.0) / (tf + norm)
+    bm25 = np.bincount(rows, weights=weights, minlength=len(texts))
+    coverage = np.diff(counts.indptr) / len(terms)
+    return bm25, coverage
+
+
+def rank(query: str, documents: Dict[str, str], top_k: int = 0,
+         min_coverage: float = MIN_COVERAGE) -> List[Tuple[str, float]]:
+    """
+    Rank relevant documents by BM25.
+
+    Args:
+        query: Search query
+        documents: Dict of key (e.g. URL) to text
+        top_k: Keep at most this many (0 = all relevant)
+        min_coverage: Minimum share of the distinct query terms a document must contain
+
+    Returns:
+        (key, BM25 score) of the relevant documents, best first
+    """
+    keys = list(documents)
+    bm25, coverage = score(query, [documents[key] for key in keys])
+    order = np.argsort(-bm25, kind="stable")
+    ranked = [(keys[i], float(bm25[i])) for i in order if coverage[i] >= min_coverage]
+    return ranked[:top_k] if top_k else ranked
+
+
+def filter_relevant(query: str, documents: Dict[str, str], top_k: int = 0,
+                    min_coverage: float = MIN_COVERAGE) -> Dict[str, str]:
+    """Keep the relevant documents, best first (see rank())."""
+    return {key: documents[key] for key, _ in rank(query, documents, top_k, min_coverage)}
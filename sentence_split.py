@@ -0,0 +1,132 @@
+"""
+Sentence segmentation shared by speech synthesis and subtitles.
+TTSCaller splits the narration once and writes a sentences.json manifest with a
+stable ID per sentence; the editor reads the manifest and matches each
+sentence's audio by index instead of splitting processed.txt again.
+"""
+
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+MANIFEST_NAME = "sentences.json"
+
+# Words ending in a period that do not end a sentence (compared lowercase, without the period)
+ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "gen", "gov", "sen", "rep", "col", "lt", "sgt",
+    "capt", "vs", "etc", "inc", "ltd", "co", "corp", "dept", "est", "approx", "fig", "jan", "feb", "mar",
+    "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec", "e.g", "i.e", "u.s", "u.k", "u.n", "a.m", "p.m",
+})
+
+# Candidate boundaries: sentence punctuation (plus closing quotes/brackets) followed by whitespace
+BOUNDARY_RE = re.compile(r"[.!?]+[\"'”’)\]]*\s+")
+LAST_WORD_RE = re.compile(r"(\S+)$")
+
+# Sentences shorter than this (e.g. a stray "." or list marker) join the previous one
+MIN_SENTENCE_CHARS = 2
+
+
+def _is_abbreviation(chunk: str) -> bool:
+    """Return True if chunk ends with a period belonging to an abbreviation or initial."""
+    match = LAST_WORD_RE.search(chunk)
+    if not match or not chunk.endswith("."):
+        return False
+    word = match.group(1).rstrip(".").lstrip("(\"'“‘")
+    # Single capital letters are initials ("J. R. R. Tolkien"), except the pronoun
+    return word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isupper() and word != "I")
+
+
+@lru_cache(maxsize=32)
+def _split(text: str) -> Tuple[str, ...]:
+    sentences: List[str] = []
+    start = 0
+    for match in BOUNDARY_RE.finditer(text):
+        candidate = text[start:match.end()].strip()
+        # A lowercase continuation ('"Really?" she asked.') keeps the sentence going
+        if _is_abbreviation(candidate) or text[match.end():match.end() + 1].islower():
+            continue
+        sentences.append(candidate)
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+
+    merged: List[str] = []
+    for sentence in sentences:
+        if merged and len(sentence) < MIN_SENTENCE_CHARS:
+            merged[-1] = f"{merged[-1]} {sentence}"
+        else:
+            merged.append(sentence)
+    return tuple(s for s in merged if len(s) >= MIN_SENTENCE_CHARS)
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences.
+
+    Abbreviations and initials do not end a sentence, and fragments too short
+    to speak are attached to the previous sentence instead of being dropped.
+    Results are cached per text.
+
+    Args:
+        text: Text to split
+
+    Returns:
+        List of sentences in order
+    """
+    return list(_split(text))
+
+
+def sentence_id(index: int, sentence: str) -> str:
+    """Stable ID of a sentence: its position plus a short hash of its text."""
+    digest = hashlib.sha1(sentence.encode("utf-8")).hexdigest()[:8]
+    return f"s{index:04d}-{digest}"
+
+
+def build_manifest(text: str, sentences: Optional[List[str]] = None) -> dict:
+    """
+    Split text and describe every sentence with its index and ID.
+
+    Args:
+        text: Narration text
+        sentences: Sentences already split from text (e.g. received from a sentence stream)
+
+    Returns:
+        Dict with "source_sha1" and "sentences" ([{index, id, text}])
+    """
+    if sentences is None:
+        sentences = split_sentences(text)
+    return {
+        "source_sha1": hashlib.sha1(text.encode("utf-8")).hexdigest(),
+        "sentences": [{"index": i, "id": sentence_id(i, s), "text": s} for i, s in enumerate(sentences)],
+    }
+
+
+def write_manifest(manifest: dict, directory: str) -> str:
+    """Write a sentence manifest into directory atomically and return its path."""
+    path = os.path.join(directory, MANIFEST_NAME)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+    return path
+
+
+def read_manifest(directory: str) -> Optional[List[dict]]:
+    """
+    Read the sentences of a manifest.
+
+    Args:
+        directory: Directory containing sentences.json
+
+    Returns:
+        Sentences ([{index, id, text}]) in order, or None if there is no manifest
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)["sentences"]
+    except (OSError, ValueError, KeyError):
+        return None
@@ -0,0 +1,120 @@
+"""
+Sentence-by-sentence hand-off of text that is still being generated.
+SentenceStreamWriter appends streamed text to a file as it arrives and, as soon
+as a sentence is followed by the start of the next one, appends it as a JSON
+line to a companion .sentences.jsonl file. A final {"done": ...} line closes
+the stream, so a follower such as TTSCaller --follow-sentences can synthesize
+finished sentences while the model is still decoding the rest. Sentences are
+split with sentence_split, so they match the manifest built from the full text.
+"""
+
+import json
+import os
+import time
+from typing import Iterator, Optional
+
+from sentence_split import split_sentences
+
+SENTENCES_SUFFIX = ".sentences.jsonl"
+
+
+def sentences_path_for(text_path: str) -> str:
+    """Return the sentence stream path that belongs to a text file (processed.txt -> processed.sentences.jsonl)."""
+    return os.path.splitext(text_path)[0] + SENTENCES_SUFFIX
+
+
+class SentenceStreamWriter:
+    """Write streamed text to a file and its completed sentences to a JSON lines file."""
+
+    def __init__(self, text_path: str, sentences_path: Optional[str] = None):
+        self.text_path = text_path
+        self.sentences_path = sentences_path or sentences_path_for(text_path)
+        self.text = ""
+        self.emitted = 0
+        self.text_file = open(text_path, "w", encoding="utf-8")
+        self.sentences_file = open(self.sentences_path, "w", encoding="utf-8")
+
+    def write(self, delta: str) -> None:
+        """Append a piece of text and publish the sentences it completes."""
+        if not delta:
+            return
+        self.text_file.write(delta)
+        self.text_file.flush()
+        self.text += delta
+        # A sentence can only end where whitespace follows its punctuation
+        if any(c.isspace() for c in delta):
+            self._emit(final=False)
+
+    def _emit(self, final: bool) -> None:
+        sentences = split_sentences(self.text)
+        # The last sentence may still grow unless the text is complete
+        ready = sentences if final else sentences[:-1]
+        for sentence in ready[self.emitted:]:
+            self.sentences_file.write(json.dumps({"index": self.emitted, "text": sentence}, ensure_ascii=False) + "\n")
+            self.emitted += 1
+        self.sentences_file.flush()
+
+    def close(self, complete: bool = True) -> None:
+        """
+        Publish the remaining sentences and mark the stream as finished.
+
+        Args:
+            complete: False if generation failed and the text is partial
+        """
+        if self.sentences_file.closed:
+            return
+        self._emit(final=True)
+        self.sentences_file.write(json.dumps({"done": True, "complete": complete, "count": self.emitted}) + "\n")
+        self.sentences_file.close()
+        self.text_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+        return False
+
+
+def follow_sentences(path: str, timeout: float = 600.0, poll: float = 0.2) -> Iterator[str]:
+    """
+    Yield the sentences of a stream as they are written.
+
+    Args:
+        path: .sentences.jsonl file (it may not exist yet)
+        timeout: Seconds without a new line after which to give up
+        poll: Seconds between checks for new lines
+
+    Yields:
+        Sentence texts in order
+
+    Raises:
+        TimeoutError: If the stream stalls for longer than timeout
+        RuntimeError: If the writer marked the stream as incomplete
+    """
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{path} did not appear within {timeout:.0f}s")
+        time.sleep(poll)
+    pending = ""
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No new sentence in {path} for {timeout:.0f}s")
+                time.sleep(poll)
+                continue
+            pending += chunk
+            # A line without its newline is still being written
+            if not pending.endswith("\n"):
+                continue
+            record = json.loads(pending)
+            pending = ""
+            deadline = time.monotonic() + timeout
+            if record.get("done"):
+                if not record.get("complete", True):
+                    raise RuntimeError(f"{path} ended before the text was complete")
+                return
+            yield record["text"]
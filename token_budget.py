@@ -0,0 +1,203 @@
+"""
+Token counting, sentence-boundary chunking and map-reduce summarization for
+the local LLM calls.
+Tokens are counted with the model's own tokenizer through the tokenizers
+library; when it cannot be loaded (offline, not installed) a characters-per-
+token estimate is used instead. Text is split into chunks that fit a token
+budget without cutting sentences, the chunks are processed concurrently and the
+partial results are merged.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from sentence_split import split_sentences
+
+# Context length the models are loaded with (lms load --context-length)
+CONTEXT_TOKENS = 8096
+# Hugging Face repo or local tokenizer.json of the Dolphin 3.0 / Llama 3.1 model served by LM Studio
+DEFAULT_TOKENIZER = "cognitivecomputations/Dolphin3.0-Llama3.1-8B"
+# Fallback estimate for English text with Llama-style BPE vocabularies
+CHARS_PER_TOKEN = 3.6
+# Tokens kept free for chat template overhead and counting differences
+SAFETY_MARGIN = 256
+MAP_WORKERS = 4
+
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+SUMMARIZE_PROMPT = ("Summarize the following part of a longer text. Keep every fact, name, number and date, "
+                    "drop repetition and boilerplate, and do not add comments of your own.")
+MERGE_PROMPT = ("The following are summaries of consecutive parts of one text. Merge them into a single "
+                "summary, keeping every fact, name, number and date and removing repetition.")
+
+
+@lru_cache(maxsize=4)
+def load_tokenizer(name: str = DEFAULT_TOKENIZER):
+    """
+    Load a tokenizer from a tokenizer.json path or a Hugging Face repo.
+
+    Args:
+        name: Path or repo name
+
+    Returns:
+        tokenizers.Tokenizer, or None if it cannot be loaded
+    """
+    try:
+        from tokenizers import Tokenizer
+        if os.path.isfile(name):
+            return Tokenizer.from_file(name)
+        return Tokenizer.from_pretrained(name)
+    except Exception as e:
+        print(f"Tokenizer {name} unavailable ({type(e).__name__}), estimating tokens from text length")
+        return None
+
+
+def count_tokens(text: str, tokenizer: Optional[str] = DEFAULT_TOKENIZER) -> int:
+    """
+    Count the tokens of text.
+
+    Args:
+        text: Text to count
+        tokenizer: Tokenizer path or repo (None to always estimate)
+
+    Returns:
+        Token count (estimated when the tokenizer is unavailable)
+    """
+    if not text:
+        return 0
+    loaded = load_tokenizer(tokenizer) if tokenizer else None
+    if loaded is None:
+        return int(len(text) / CHARS_PER_TOKEN) + 1
+    return len(loaded.encode(text, add_special_tokens=False).ids)
+
+
+def chunk_budget(prompt: str = "", context_tokens: int = CONTEXT_TOKENS, reply_ratio: float = 1.0,
+                 margin: int = SAFETY_MARGIN) -> int:
+    """
+    Tokens one chunk may use so that prompt, chunk and reply fit the context.
+
+    Args:
+        prompt: Instructions sent along with every chunk
+        context_tokens: Context length of the loaded model
+        reply_ratio: Expected reply length relative to the chunk (1.0 when the
+            model rewrites the text, lower for summaries)
+        margin: Tokens kept free
+
+    Returns:
+        Maximum chunk size in tokens (at least 64)
+    """
+    available = context_tokens - count_tokens(prompt) - margin
+    return max(64, int(available / (1.0 + reply_ratio)))
+
+
+def _split_long_sentence(sentence: str, max_tokens: int) -> List[str]:
+    """Split a sentence that alone exceeds max_tokens at word boundaries."""
+    pieces: List[str] = []
+    current: List[str] = []
+    for word in sentence.split():
+        if current and count_tokens(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens tokens.
+
+    Chunks end on sentence boundaries and keep paragraph breaks; only a single
+    sentence longer than the budget is cut between words.
+
+    Args:
+        text: Text to split
+        max_tokens: Token budget of one chunk
+
+    Returns:
+        Chunks in order (empty for blank text)
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text.strip()] if text.strip() else []
+    chunks: List[str] = []
+    current = ""
+    current_tokens = 0
+    for paragraph in PARAGRAPH_RE.split(text):
+        for position, sentence in enumerate(split_sentences(paragraph.strip())):
+            separator = "\n\n" if position == 0 else " "
+            tokens = count_tokens(sentence)
+            pieces = [sentence] if tokens <= max_tokens else _split_long_sentence(sentence, max_tokens)
+            for piece in pieces:
+                piece_tokens = tokens if len(pieces) == 1 else count_tokens(piece)
+                # +1 for the separator
+                if current and current_tokens + piece_tokens + 1 > max_tokens:
+                    chunks.append(current)
+                    current, current_tokens = "", 0
+                current = f"{current}{separator}{piece}" if current else piece
+                current_tokens += piece_tokens + (1 if current_tokens else 0)
+                separator = " "
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def map_reduce(text: str, map_fn: Callable[[str], str], reduce_fn: Optional[Callable[[str], str]] = None,
+               max_tokens: int = 0, workers: int = MAP_WORKERS, max_rounds: int = 3) -> str:
+    """
+    Apply map_fn to every chunk of text concurrently and merge the results.
+
+    Without reduce_fn the partial results are joined in order (for rewriting
+    tasks). With reduce_fn the joined results are passed to it, after being
+    mapped again while they still exceed the budget.
+
+    Args:
+        text: Input text
+        map_fn: Called with each chunk, returns its result
+        reduce_fn: Called with the joined partial results (optional)
+        max_tokens: Chunk budget (defaults to chunk_budget())
+        workers: Chunks processed at once (0 for all of them, when map_fn limits its own concurrency)
+        max_rounds: Limit on repeated reduction rounds
+
+    Returns:
+        Merged result
+    """
+    max_tokens = max_tokens or chunk_budget()
+    chunks = chunk_text(text, max_tokens)
+    if not chunks:
+        return ""
+    if len(chunks) == 1:
+        return map_fn(chunks[0])
+    print(f"Text of {count_tokens(text)} tokens split into {len(chunks)} chunks of up to {max_tokens} tokens")
+    with ThreadPoolExecutor(max_workers=max(1, min(workers or len(chunks), len(chunks)))) as executor:
+        partials = list(executor.map(map_fn, chunks))
+    combined = "\n\n".join(partial.strip() for partial in partials if partial and partial.strip())
+    if reduce_fn is None:
+        return combined
+    if count_tokens(combined) > max_tokens and max_rounds > 1:
+        return map_reduce(combined, reduce_fn, reduce_fn, max_tokens, workers, max_rounds - 1)
+    return reduce_fn(combined)
+
+
+def summarize(text: str, complete: Callable[[str, str], str], max_tokens: int = 0,
+              workers: int = MAP_WORKERS) -> str:
+    """
+    Summarize text of any length with map-reduce.
+
+    Args:
+        text: Text to summarize
+        complete: Called with (system prompt, user text), returns the model's reply
+        max_tokens: Chunk budget (defaults to a budget for summary-sized replies)
+        workers: Chunks summarized at once
+
+    Returns:
+        Summary text
+    """
+    max_tokens = max_tokens or chunk_budget(MERGE_PROMPT, reply_ratio=0.5)
+    return map_reduce(text,
+                      lambda chunk: complete(SUMMARIZE_PROMPT, chunk),
+                      lambda merged: complete(MERGE_PROMPT, merged),
+                      max_tokens, workers)
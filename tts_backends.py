@@ -0,0 +1,159 @@
+"""
+Pluggable speech synthesis backends for TTSCaller.
+Every backend follows the OPENAIFM node convention: generate() returns a tuple
+whose first element is {"waveform": [batch, channels, samples], "sample_rate": int}.
+The local and HTTP backends let the pipeline run and be benchmarked without the
+ComfyUI node or network access.
+"""
+
+import hashlib
+import io
+import re
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+BACKENDS = ("openaifm", "local", "http")
+DEFAULT_BACKEND_URL = "http://127.0.0.1:8765/api/generate"
+
+# Formant frequencies (F1, F2) of the vowel sounds the local synthesizer hums
+VOWEL_FORMANTS = {
+    "a": (730, 1090), "e": (530, 1840), "i": (270, 2290),
+    "o": (570, 840), "u": (300, 870), "y": (440, 1020),
+}
+
+
+class TTSBackend:
+    """Base class of a speech synthesis backend."""
+
+    name = "base"
+
+    def generate(self, text: str, voice: str, vibe: str = "---", vibe_text: str = "") -> Tuple[dict]:
+        raise NotImplementedError
+
+
+class OpenAIFMBackend(TTSBackend):
+    """The ComfyUI-OpenAI-FM node, with its own WAV saving disabled."""
+
+    name = "openaifm"
+
+    def __init__(self, openaifm_mod: Any):
+        self.node = openaifm_mod.OPENAIFM()
+        # TTSCaller writes the sentences itself, in order
+        if hasattr(self.node, "save_audio_file"):
+            self.node.save_audio_file = lambda *a, **k: None
+        if hasattr(openaifm_mod, "save_audio_file"):
+            openaifm_mod.save_audio_file = lambda *a, **k: None
+
+    def generate(self, text: str, voice: str, vibe: str = "---", vibe_text: str = "") -> Tuple[dict]:
+        return self.node.generate(text, voice, vibe, vibe_text)
+
+
+class LocalSineBackend(TTSBackend):
+    """
+    Deterministic offline synthesizer.
+
+    Each word becomes a voiced tone whose formants follow the word's vowels and
+    whose length is proportional to its character count; words are separated by
+    short pauses and sentences by longer ones. The same text and voice always
+    produce the same samples.
+    """
+
+    name = "local"
+
+    def __init__(self, sample_rate: int = 24000, seconds_per_char: float = 0.065,
+                 word_gap: float = 0.06, sentence_gap: float = 0.35):
+        self.sample_rate = sample_rate
+        self.seconds_per_char = seconds_per_char
+        self.word_gap = word_gap
+        self.sentence_gap = sentence_gap
+
+    def _pitch(self, voice: str) -> float:
+        digest = hashlib.sha256(voice.encode("utf-8")).digest()
+        return 95.0 + digest[0] % 120
+
+    def synthesize(self, text: str, voice: str) -> np.ndarray:
+        """
+        Render text as mono float32 samples.
+
+        Args:
+            text: Text to render
+            voice: Voice name (selects the pitch)
+
+        Returns:
+            1-D float32 array
+        """
+        pitch = self._pitch(voice)
+        parts = []
+        for word in re.findall(r"\S+", text):
+            letters = re.sub(r"[^A-Za-z]", "", word).lower() or "a"
+            length = int(self.sample_rate * self.seconds_per_char * max(2, len(word)))
+            t = np.arange(length) / self.sample_rate
+            vowels = [c for c in letters if c in VOWEL_FORMANTS] or ["a"]
+            # Step through the word's vowels so formants move over time
+            formants = np.array([VOWEL_FORMANTS[v] for v in vowels], dtype=np.float64)
+            position = np.minimum(np.arange(length) // max(1, length // len(vowels)), len(vowels) - 1)
+            glottal = np.sign(np.sin(2 * np.pi * pitch * t)) * 0.3
+            voiced = glottal * (np.sin(2 * np.pi * formants[position, 0] * t) + 0.5 * np.sin(2 * np.pi * formants[position, 1] * t))
+            envelope = np.minimum(1.0, np.minimum(t, t[-1] - t) / 0.01)
+            parts.append((0.3 * voiced * envelope).astype(np.float32))
+            gap = self.sentence_gap if word[-1] in ".!?" else self.word_gap
+            parts.append(np.zeros(int(self.sample_rate * gap), dtype=np.float32))
+        if not parts:
+            return np.zeros(int(self.sample_rate * self.sentence_gap), dtype=np.float32)
+        return np.concatenate(parts)
+
+    def generate(self, text: str, voice: str, vibe: str = "---", vibe_text: str = "") -> Tuple[dict]:
+        samples = self.synthesize(text, voice)
+        return ({"waveform": samples[None, None, :], "sample_rate": self.sample_rate},)
+
+
+class HttpBackend(TTSBackend):
+    """
+    A server exposing the OpenAIFM form API (POST input/prompt/voice, audio in the response).
+
+    Works against the mock server in dev_servers.py or any compatible endpoint.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str = DEFAULT_BACKEND_URL, timeout: float = 60.0):
+        import requests
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def generate(self, text: str, voice: str, vibe: str = "---", vibe_text: str = "") -> Tuple[dict]:
+        import soundfile as sf
+        response = self.session.post(self.url, timeout=self.timeout, data={
+            "input": text,
+            "prompt": vibe_text,
+            "voice": voice,
+            "vibe": vibe,
+        })
+        response.raise_for_status()
+        data, sample_rate = sf.read(io.BytesIO(response.content), dtype="float32", always_2d=True)
+        return ({"waveform": data.T[None, :, :], "sample_rate": sample_rate},)
+
+
+def create_backend(name: str, openaifm_mod: Optional[Any] = None, url: str = DEFAULT_BACKEND_URL) -> TTSBackend:
+    """
+    Create a backend by name.
+
+    Args:
+        name: One of BACKENDS
+        openaifm_mod: Loaded openaifm module (required for "openaifm")
+        url: Endpoint of the "http" backend
+
+    Returns:
+        Backend instance
+    """
+    if name == "openaifm":
+        if openaifm_mod is None:
+            raise ValueError("The openaifm backend needs the loaded openaifm module")
+        return OpenAIFMBackend(openaifm_mod)
+    if name == "local":
+        return LocalSineBackend()
+    if name == "http":
+        return HttpBackend(url)
+    raise ValueError(f"Unknown TTS backend: {name}")
@@ -0,0 +1,147 @@
+"""
+Persistent cache of synthesized sentences for TTSCaller.
+Entries are keyed by normalized sentence text, voice, vibe and optional vibe
+text, stored as FLAC with their metadata in a JSON index, and evicted least
+recently used first once the cache exceeds its size cap.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "tts")
+DEFAULT_MAX_MB = 500
+
+
+def normalize_text(text: str) -> str:
+    """Normalize sentence text so trivial whitespace or Unicode differences share an entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str, voice: str, vibe: str = "---", vibe_text: str = "", backend: str = "openaifm") -> str:
+    """
+    Build the cache key of a synthesis request.
+
+    Args:
+        text: Sentence text
+        voice: Voice name
+        vibe: Vibe name
+        vibe_text: Optional custom vibe prompt
+        backend: Synthesis backend name
+
+    Returns:
+        Hex digest identifying the request
+    """
+    fields = [normalize_text(text), voice, vibe, vibe_text.strip()]
+    if backend != "openaifm":
+        # Keeps keys of entries made before backends were selectable unchanged
+        fields.append(backend)
+    payload = json.dumps(fields, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Size-capped LRU cache of sentence audio."""
+
+    def __init__(self, directory: Union[str, Path] = DEFAULT_CACHE_DIR, max_mb: float = DEFAULT_MAX_MB):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.index_path = self.directory / "index.json"
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Load the cached audio for key.
+
+        Args:
+            key: Cache key from cache_key()
+
+        Returns:
+            Tuple of (float32 samples, sample_rate) on a cache hit, None otherwise
+        """
+        import soundfile as sf
+        with self.lock:
+            entry = self.entries.get(key)
+        path = self.directory / entry["file"] if entry else None
+        if path is None or not path.exists():
+            with self.lock:
+                self.misses += 1
+            return None
+        data, sample_rate = sf.read(str(path), dtype="float32", always_2d=True)
+        with self.lock:
+            entry["last_used"] = time.time()
+            self.hits += 1
+        return data, sample_rate
+
+    def put(self, key: str, data: np.ndarray, sample_rate: int, **metadata) -> None:
+        """
+        Store synthesized audio under key, compressed as FLAC.
+
+        Args:
+            key: Cache key from cache_key()
+            data: Samples of shape (samples, channels)
+            sample_rate: Sample rate in Hz
+            **metadata: Extra fields kept in the index (text, voice, vibe, ...)
+        """
+        import soundfile as sf
+        filename = f"{key}.flac"
+        sf.write(str(self.directory / filename), data, int(sample_rate), format="FLAC", subtype="PCM_16")
+        with self.lock:
+            self.entries[key] = dict(
+                metadata,
+                file=filename,
+                bytes=(self.directory / filename).stat().st_size,
+                sample_rate=int(sample_rate),
+                duration=len(data) / float(sample_rate),
+                last_used=time.time(),
+            )
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits its cap; returns the number removed."""
+        removed = 0
+        with self.lock:
+            total = sum(entry["bytes"] for entry in self.entries.values())
+            for key, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    (self.directory / entry["file"]).unlink()
+                except FileNotFoundError:
+                    pass
+                total -= entry["bytes"]
+                del self.entries[key]
+                removed += 1
+        return removed
+
+    def save(self) -> None:
+        """Evict over-cap entries and persist the index."""
+        self.evict()
+        with self.lock:
+            temp_path = self.index_path.with_suffix(".tmp")
+            with temp_path.open("w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self) -> str:
+        return f"TTS cache: {self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate)"